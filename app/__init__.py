@@ -30,6 +30,18 @@ def create_app(config_name='default'):
     csrf.init_app(app)
     migrate.init_app(app, db)
 
+    from app.services.live_stats import stats_publisher
+    stats_publisher.init_app(app)
+
+    from app.services.report_cache import report_cache
+    report_cache.init_app(app)
+
+    from app.services.analytics import analytics_cube
+    analytics_cube.init_app(app)
+
+    from app.services.api_key_cache import api_key_cache
+    api_key_cache.init_app(app)
+
     # إعدادات تسجيل الدخول
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'يرجى تسجيل الدخول للوصول لهذه الصفحة'
@@ -63,6 +75,9 @@ def create_app(config_name='default'):
     app.register_blueprint(settings_bp, url_prefix='/settings')
     app.register_blueprint(api_bp, url_prefix='/api/v2')
 
+    # الـ API يعتمد على مفتاح في الـ Header وليس على جلسة المتصفح
+    csrf.exempt(api_bp)
+
     # تسجيل Context Processors
     from app.utils.helpers import (
         format_money, format_date, format_datetime,
@@ -38,6 +38,26 @@ class Config:
     # إعدادات Pagination
     ITEMS_PER_PAGE = 10
 
+    # البث المباشر لإحصائيات لوحة التحكم (ثواني)
+    LIVE_STATS_INTERVAL = int(os.environ.get('LIVE_STATS_INTERVAL') or 10)
+    LIVE_STATS_HEARTBEAT = 15
+
+    # مهام التقارير في الخلفية (flask report-worker)
+    REPORT_RESULTS_DIR = os.environ.get('REPORT_RESULTS_DIR')
+    REPORT_RESULT_TTL = int(os.environ.get('REPORT_RESULT_TTL') or 3600)
+    REPORT_JOB_TIMEOUT = 3600
+
+    # ذاكرة نتائج التقارير (لكل عملية)
+    REPORT_CACHE_MAX_ENTRIES = int(os.environ.get('REPORT_CACHE_MAX_ENTRIES') or 256)
+    REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES') or 32 * 1024 * 1024)
+
+    # المكعب التحليلي (الجداول المحورية): أقل فترة بين تحديثين بالثواني
+    ANALYTICS_REFRESH_SECONDS = int(os.environ.get('ANALYTICS_REFRESH_SECONDS') or 60)
+
+    # مفاتيح API: مدة بقاء المفتاح في الذاكرة، والفترة بين كتابات آخر استخدام (ثواني)
+    API_KEY_CACHE_SECONDS = int(os.environ.get('API_KEY_CACHE_SECONDS') or 60)
+    API_KEY_TOUCH_SECONDS = int(os.environ.get('API_KEY_TOUCH_SECONDS') or 60)
+
 
 class DevelopmentConfig(Config):
     """إعدادات التطوير"""
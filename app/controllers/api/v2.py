@@ -1,17 +1,37 @@
 """
 API v2 Controller - RESTful API متكاملة
 """
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
-from flask import request, jsonify
+from urllib.parse import urlsplit
+from flask import current_app, request, jsonify, url_for, send_file
+from werkzeug.test import EnvironBuilder
 from app.controllers.api import api_bp
 from app.models.product import Product
 from app.models.category import Category
+from app.models.installment_plan import InstallmentPlan
 from app.models.customer import Customer
 from app.models.invoice import Invoice, InvoiceItem
 from app.models.installment import Installment
 from app.models.payment import Payment
 from app.models.activity_log import ActivityLog
-from app.utils.decorators import api_key_required
+from app.models.daily_rollup import DailySalesRollup, DailyCollectionRollup
+from app.models.report_job import ReportJob
+from app.services.stats import get_today_sales_stats
+from app.services.live_stats import stats_publisher
+from app.services.report_jobs import submit_job
+from app.services.aging import get_aging_totals, get_aging_by_customer
+from app.services.forecast import get_forecast
+from app.services.performance import (
+    PERFORMANCE_SOURCES, get_user_performance, get_user_timeline
+)
+from app.services.analytics import analytics_cube, pivot_filters
+from app.services.bulk_upsert import BULK_MAX_ROWS, PRODUCT_UPSERT, CUSTOMER_UPSERT
+from app.utils.decorators import BATCH_API_KEY_ENVIRON, api_key_required, conditional_get
+from app.utils.pagination import KeysetPagination, SqlPagination
+from app.utils.fieldsets import FieldSet
+from app.utils.export import ndjson_response
+from app.utils.helpers import date_range_filter
 from app import db
 
 
@@ -27,14 +47,122 @@ def api_response(success, data=None, message=None, error=None, status_code=200):
     return jsonify(response), status_code
 
 
+def _paginate(query, keys):
+    """
+    صفحة من استعلام قائمة:
+    - ?cursor= (فارغ للصفحة الأولى): تقسيم بالمؤشر على مفاتيح مفهرسة، والعدد
+      الكلي فقط مع ?with_total=1. يُستخدم للمزامنة والمرور على كل الصفحات.
+    - ?page=: الترقيم القديم (OFFSET مع العدد الكلي) للتوافق.
+    يرجع (العناصر، بيانات الترقيم).
+    """
+    per_page = min(100, request.args.get('per_page', 20, type=int))
+
+    if 'cursor' in request.args:
+        pagination = KeysetPagination(
+            query, keys, request.args.get('cursor') or None, per_page,
+            with_total=request.args.get('with_total') == '1'
+        )
+        meta = {
+            'per_page': pagination.per_page,
+            'next_cursor': pagination.next_cursor,
+            'has_more': pagination.has_more
+        }
+        if pagination.total is not None:
+            meta['total'] = pagination.total
+        return pagination.items, meta
+
+    page = request.args.get('page', 1, type=int)
+    pagination = SqlPagination(query.order_by(*[
+        column.desc() if descending else column.asc() for column, descending in keys
+    ]), page, per_page)
+    return pagination.items, {
+        'total': pagination.total,
+        'page': pagination.page,
+        'per_page': pagination.per_page,
+        'total_pages': (pagination.total + pagination.per_page - 1) // pagination.per_page
+    }
+
+
+# الحقول المتاحة في ?fields= و ?include= لكل مورد
+PRODUCT_FIELDS = FieldSet(Product, options=Product.load_options)
+CATEGORY_FIELDS = FieldSet(
+    Category,
+    derived={'products_count': (Category.get_products_counts, None)},
+    defaults=('products_count',),
+    preload=Category.preload_products_count
+)
+CUSTOMER_FIELDS = FieldSet(
+    Customer,
+    derived={
+        'balance': (Customer.get_balances, 0),
+        'active_invoices_count': (Customer.get_balances, 1),
+    },
+    defaults=('balance', 'active_invoices_count'),
+    preload=Customer.preload_balances,
+    hidden=('national_id_image',)
+)
+INVOICE_FIELDS = FieldSet(
+    Invoice,
+    options=Invoice.load_options,
+    derived={
+        'paid_installments_count': (Invoice.get_installment_counts, 0),
+        'pending_installments_count': (Invoice.get_installment_counts, 1),
+    }
+)
+INSTALLMENT_FIELDS = FieldSet(
+    Installment,
+    options=Installment.load_options,
+    expressions={'status': Installment.current_status_expr}
+)
+PAYMENT_FIELDS = FieldSet(Payment, options=Payment.load_options)
+
+
+def _bulk_response(upsert):
+    """إضافة/تحديث جماعي: الجسم قائمة صفوف أو {"items": [...]}، والنتيجة لكل صف"""
+    data = request.get_json(silent=True)
+    rows = data.get('items') if isinstance(data, dict) else data
+
+    if not isinstance(rows, list) or not rows:
+        return api_response(False, error='بيانات غير صالحة', status_code=400)
+    if len(rows) > BULK_MAX_ROWS:
+        return api_response(
+            False, error=f'الحد الأقصى {BULK_MAX_ROWS} صف في الطلب', status_code=400)
+
+    results = upsert.run(rows)
+    counts = {'created': 0, 'updated': 0, 'error': 0}
+    for result in results:
+        counts[result['status']] += 1
+
+    return api_response(True, data={
+        'created': counts['created'],
+        'updated': counts['updated'],
+        'failed': counts['error'],
+        'results': results
+    })
+
+
+def _list_response(query, keys, fieldset):
+    """استجابة قائمة مقسمة لصفحات مع ?fields= و ?include= (400 للمدخلات غير الصالحة)"""
+    try:
+        fields, include = fieldset.parse(request.args)
+        items, meta = _paginate(fieldset.prepare(query, fields, keys), keys)
+    except ValueError as e:
+        return api_response(False, error=str(e), status_code=400)
+
+    return jsonify({
+        'success': True,
+        'data': fieldset.serialize(items, fields, include),
+        'pagination': meta
+    })
+
+
 # =============== المنتجات (Products) ===============
 
 @api_bp.route('/products', methods=['GET'])
 @api_key_required
+@conditional_get(Product, Category)
 def get_products():
     """جلب جميع المنتجات"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(100, request.args.get('per_page', 20, type=int))
     search = request.args.get('q', '')
     category_id = request.args.get('category', type=int)
 
@@ -52,19 +180,7 @@ def get_products():
     if category_id:
         query = query.filter_by(category_id=category_id)
 
-    total = query.count()
-    products = query.offset((page - 1) * per_page).limit(per_page).all()
-
-    return jsonify({
-        'success': True,
-        'data': [p.to_dict() for p in products],
-        'pagination': {
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page
-        }
-    })
+    return _list_response(query, [(Product.id, False)], PRODUCT_FIELDS)
 
 
 @api_bp.route('/products/<int:id>', methods=['GET'])
@@ -116,6 +232,13 @@ def create_product():
         return api_response(False, error=str(e), status_code=500)
 
 
+@api_bp.route('/products/bulk', methods=['POST'])
+@api_key_required
+def bulk_upsert_products():
+    """إضافة/تحديث منتجات بالجملة (المطابقة بالباركود ثم SKU)"""
+    return _bulk_response(PRODUCT_UPSERT)
+
+
 @api_bp.route('/products/<int:id>', methods=['PUT'])
 @api_key_required
 def update_product(id):
@@ -184,14 +307,21 @@ def delete_product(id):
 
 @api_bp.route('/categories', methods=['GET'])
 @api_key_required
+@conditional_get(Category, Product)
 def get_categories():
     """جلب جميع التصنيفات"""
-    categories = Category.query.filter_by(
-        is_active=True).order_by(Category.sort_order).all()
+    try:
+        fields, include = CATEGORY_FIELDS.parse(request.args)
+    except ValueError as e:
+        return api_response(False, error=str(e), status_code=400)
+
+    categories = CATEGORY_FIELDS.prepare(
+        Category.query.filter_by(is_active=True).order_by(Category.sort_order), fields
+    ).all()
 
     return jsonify({
         'success': True,
-        'data': [c.to_dict() for c in categories]
+        'data': CATEGORY_FIELDS.serialize(categories, fields, include)
     })
 
 
@@ -293,14 +423,22 @@ def delete_category(id):
         return api_response(False, error=str(e), status_code=500)
 
 
+# =============== خطط التقسيط (Installment Plans) ===============
+
+@api_bp.route('/installment-plans', methods=['GET'])
+@api_key_required
+@conditional_get(InstallmentPlan)
+def get_installment_plans():
+    """جلب خطط التقسيط النشطة"""
+    return api_response(True, data=[plan.to_dict() for plan in InstallmentPlan.get_active_plans()])
+
+
 # =============== العملاء (Customers) ===============
 
 @api_bp.route('/customers', methods=['GET'])
 @api_key_required
 def get_customers():
     """جلب جميع العملاء"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(100, request.args.get('per_page', 20, type=int))
     search = request.args.get('q', '')
 
     query = Customer.query.filter_by(is_active=True)
@@ -314,19 +452,7 @@ def get_customers():
             )
         )
 
-    total = query.count()
-    customers = query.offset((page - 1) * per_page).limit(per_page).all()
-
-    return jsonify({
-        'success': True,
-        'data': [c.to_dict() for c in customers],
-        'pagination': {
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page
-        }
-    })
+    return _list_response(query, [(Customer.id, False)], CUSTOMER_FIELDS)
 
 
 @api_bp.route('/customers/<int:id>', methods=['GET'])
@@ -382,6 +508,13 @@ def create_customer():
         return api_response(False, error=str(e), status_code=500)
 
 
+@api_bp.route('/customers/bulk', methods=['POST'])
+@api_key_required
+def bulk_upsert_customers():
+    """إضافة/تحديث عملاء بالجملة (المطابقة بالهاتف ثم الرقم القومي)"""
+    return _bulk_response(CUSTOMER_UPSERT)
+
+
 @api_bp.route('/customers/<int:id>', methods=['PUT'])
 @api_key_required
 def update_customer(id):
@@ -456,13 +589,15 @@ def delete_customer(id):
 @api_key_required
 def get_invoices():
     """جلب جميع الفواتير"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(100, request.args.get('per_page', 20, type=int))
-    invoice_type = request.args.get('type', '')
-    status = request.args.get('status', '')
-    customer_id = request.args.get('customer_id', type=int)
+    return _list_response(
+        _filter_invoices(Invoice.query, request.args), [(Invoice.id, True)], INVOICE_FIELDS)
+
 
-    query = Invoice.query
+def _filter_invoices(query, args):
+    """فلاتر الفواتير (القائمة والتصدير)"""
+    invoice_type = args.get('type', '')
+    status = args.get('status', '')
+    customer_id = args.get('customer_id', type=int)
 
     if invoice_type:
         query = query.filter(Invoice.invoice_type == invoice_type)
@@ -473,21 +608,7 @@ def get_invoices():
     if customer_id:
         query = query.filter(Invoice.customer_id == customer_id)
 
-    query = query.order_by(Invoice.id.desc())
-
-    total = query.count()
-    invoices = query.offset((page - 1) * per_page).limit(per_page).all()
-
-    return jsonify({
-        'success': True,
-        'data': [i.to_dict() for i in invoices],
-        'pagination': {
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page
-        }
-    })
+    return query
 
 
 @api_bp.route('/invoices/<int:id>', methods=['GET'])
@@ -554,7 +675,8 @@ def create_invoice():
                 product_name=product.name,
                 quantity=quantity,
                 unit_price=price,
-                total_price=price * quantity
+                total_price=price * quantity,
+                unit_cost=product.cost_price
             )
 
             db.session.add(invoice_item)
@@ -592,7 +714,10 @@ def create_invoice():
                 )
                 db.session.add(installment)
 
+        DailySalesRollup.record_invoice(invoice)
+
         db.session.commit()
+        stats_publisher.request_refresh()
 
         return api_response(True, data=invoice.to_dict(include_items=True), message='تم إنشاء الفاتورة بنجاح', status_code=201)
 
@@ -607,34 +732,33 @@ def create_invoice():
 @api_key_required
 def get_installments():
     """جلب جميع الأقساط"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(100, request.args.get('per_page', 20, type=int))
-    status = request.args.get('status', '')
-    invoice_id = request.args.get('invoice_id', type=int)
-
-    query = Installment.query
-
-    if status:
+    return _list_response(
+        _filter_installments(Installment.query, request.args),
+        [(Installment.due_date, False), (Installment.id, False)],
+        INSTALLMENT_FIELDS
+    )
+
+
+def _filter_installments(query, args):
+    """فلاتر الأقساط (القائمة والتصدير)"""
+    status = args.get('status', '')
+    invoice_id = args.get('invoice_id', type=int)
+
+    # حالة التأخير تُحسب من تاريخ الاستحقاق وليس من عمود الحالة فقط
+    if status == 'overdue':
+        query = query.filter(Installment.overdue_filter())
+    elif status in ['pending', 'partial']:
+        query = query.filter(
+            Installment.status == status,
+            Installment.due_date >= date.today()
+        )
+    elif status:
         query = query.filter(Installment.status == status)
 
     if invoice_id:
         query = query.filter(Installment.invoice_id == invoice_id)
 
-    query = query.order_by(Installment.due_date)
-
-    total = query.count()
-    installments = query.offset((page - 1) * per_page).limit(per_page).all()
-
-    return jsonify({
-        'success': True,
-        'data': [i.to_dict() for i in installments],
-        'pagination': {
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page
-        }
-    })
+    return query
 
 
 @api_bp.route('/installments/<int:id>', methods=['GET'])
@@ -666,7 +790,6 @@ def get_today_installments():
 @api_key_required
 def get_overdue_installments():
     """الأقساط المتأخرة"""
-    Installment.update_overdue_status()
     installments = Installment.get_overdue()
 
     total_overdue = sum(float(i.remaining_amount or i.amount)
@@ -711,6 +834,7 @@ def pay_installment(id):
         )
 
         db.session.add(payment)
+        DailyCollectionRollup.record_payment(payment)
 
         # تحديث القسط
         remaining = float(
@@ -731,6 +855,7 @@ def pay_installment(id):
             invoice.status = 'paid'
 
         db.session.commit()
+        stats_publisher.request_refresh()
 
         return api_response(True, data={
             'payment': payment.to_dict(),
@@ -747,25 +872,12 @@ def pay_installment(id):
 @api_bp.route('/payments', methods=['GET'])
 @api_key_required
 def get_payments():
-    """جلب المدفوعات"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(100, request.args.get('per_page', 20, type=int))
-
-    query = Payment.query.order_by(Payment.payment_date.desc())
-
-    total = query.count()
-    payments = query.offset((page - 1) * per_page).limit(per_page).all()
-
-    return jsonify({
-        'success': True,
-        'data': [p.to_dict() for p in payments],
-        'pagination': {
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page
-        }
-    })
+    """جلب المدفوعات (الأحدث أولاً)"""
+    return _list_response(
+        Payment.query,
+        [(Payment.payment_date, True), (Payment.id, True)],
+        PAYMENT_FIELDS
+    )
 
 
 @api_bp.route('/payments/today', methods=['GET'])
@@ -788,32 +900,20 @@ def get_today_payments():
 @api_key_required
 def get_dashboard_stats():
     """إحصائيات لوحة التحكم"""
-    Installment.update_overdue_status()
-    today = date.today()
-
-    today_invoices = Invoice.query.filter(
-        db.func.date(Invoice.created_at) == today,
-        Invoice.status != 'cancelled'
-    ).all()
 
     # إحصائيات عامة
     total_products = Product.query.filter_by(is_active=True).count()
     total_customers = Customer.query.filter_by(is_active=True).count()
     total_invoices = Invoice.query.count()
 
-    # الأقساط المتأخرة
-    overdue_installments = Installment.get_overdue()
-    overdue_total = sum(float(i.remaining_amount or i.amount)
-                        for i in overdue_installments)
+    # الأقساط المتأخرة (من نفس استعلام الإحصائيات التجميعي)
+    installment_stats = Installment.get_stats()
 
     return jsonify({
         'success': True,
         'data': {
             'today': {
-                'cash_count': len([i for i in today_invoices if i.invoice_type == 'cash']),
-                'cash_total': sum(float(i.total_amount) for i in today_invoices if i.invoice_type == 'cash'),
-                'installment_count': len([i for i in today_invoices if i.invoice_type == 'installment']),
-                'installment_total': sum(float(i.total_amount) for i in today_invoices if i.invoice_type == 'installment'),
+                **get_today_sales_stats(),
                 'payments_total': Payment.get_today_total()
             },
             'totals': {
@@ -821,10 +921,10 @@ def get_dashboard_stats():
                 'customers': total_customers,
                 'invoices': total_invoices
             },
-            'installments': Installment.get_stats(),
+            'installments': installment_stats,
             'overdue': {
-                'count': len(overdue_installments),
-                'total': overdue_total
+                'count': installment_stats['overdue_count'],
+                'total': installment_stats['overdue_amount']
             }
         }
     })
@@ -847,14 +947,8 @@ def get_dashboard_summary():
     else:  # month
         start_date = today.replace(day=1)
 
-    invoices = Invoice.query.filter(
-        db.func.date(Invoice.created_at) >= start_date,
-        Invoice.status != 'cancelled'
-    ).all()
-
-    payments = Payment.query.filter(
-        db.func.date(Payment.payment_date) >= start_date
-    ).all()
+    sales = DailySalesRollup.get_totals_by_type(start_date, today)
+    collections = DailyCollectionRollup.get_totals(start_date, today)
 
     return jsonify({
         'success': True,
@@ -863,19 +957,262 @@ def get_dashboard_summary():
             'start_date': start_date.isoformat(),
             'end_date': today.isoformat(),
             'sales': {
-                'count': len(invoices),
-                'total': sum(float(i.total_amount) for i in invoices),
-                'cash': sum(float(i.total_amount) for i in invoices if i.invoice_type == 'cash'),
-                'installment': sum(float(i.total_amount) for i in invoices if i.invoice_type == 'installment')
+                'count': sum(t['count'] for t in sales.values()),
+                'total': sum(t['total'] for t in sales.values()),
+                'cash': sales.get('cash', {}).get('total', 0),
+                'installment': sales.get('installment', {}).get('total', 0)
             },
-            'collections': {
-                'count': len(payments),
-                'total': sum(float(p.amount) for p in payments)
-            }
+            'collections': collections
         }
     })
 
 
+# =============== التقارير (Reports) ===============
+
+@api_bp.route('/reports/aging', methods=['GET'])
+@api_key_required
+def get_aging_report():
+    """أعمار الذمم: إجمالي الشرائح ثم العملاء"""
+    page = request.args.get('page', 1, type=int)
+    per_page = min(100, request.args.get('per_page', 20, type=int))
+
+    pagination = get_aging_by_customer(page, per_page)
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'totals': get_aging_totals(),
+            'customers': pagination.items
+        },
+        'pagination': {
+            'total': pagination.total,
+            'page': pagination.page,
+            'per_page': pagination.per_page,
+            'total_pages': pagination.pages
+        }
+    })
+
+
+@api_bp.route('/reports/forecast', methods=['GET'])
+@api_key_required
+def get_forecast_report():
+    """توقع التحصيل (period=week|month، horizon=عدد الفترات، rates=1 لتطبيق نسب التحصيل)"""
+    data = get_forecast(
+        request.args.get('period', 'week'),
+        horizon=request.args.get('horizon', type=int),
+        apply_rates=request.args.get('rates') in ('1', 'true')
+    )
+    return api_response(True, data=data)
+
+
+def _report_period():
+    """فترة التقرير من معاملات الطلب (الافتراضي: بداية الشهر حتى اليوم)"""
+    today = date.today()
+    from_date = datetime.strptime(
+        request.args.get('from', today.replace(day=1).isoformat()), '%Y-%m-%d').date()
+    to_date = datetime.strptime(
+        request.args.get('to', today.isoformat()), '%Y-%m-%d').date()
+    return from_date, to_date
+
+
+@api_bp.route('/reports/performance', methods=['GET'])
+@api_key_required
+def get_performance_report():
+    """أداء الموظفين: المبيعات والتحصيل وكفاءة التحصيل لكل مستخدم"""
+    try:
+        from_date, to_date = _report_period()
+    except ValueError:
+        return api_response(False, error='صيغة التاريخ غير صحيحة (YYYY-MM-DD)', status_code=400)
+
+    page = request.args.get('page', 1, type=int)
+    per_page = min(100, request.args.get('per_page', 20, type=int))
+    source = request.args.get('source', 'rollup')
+    if source not in PERFORMANCE_SOURCES:
+        source = 'rollup'
+
+    pagination = get_user_performance(from_date, to_date, page, per_page, source=source)
+
+    return jsonify({
+        'success': True,
+        'data': pagination.items,
+        'pagination': {
+            'total': pagination.total,
+            'page': pagination.page,
+            'per_page': pagination.per_page,
+            'total_pages': pagination.pages
+        }
+    })
+
+
+@api_bp.route('/reports/performance/<int:user_id>', methods=['GET'])
+@api_key_required
+def get_user_performance_timeline(user_id):
+    """مبيعات وتحصيل مستخدم لكل يوم أو شهر (user_id = 0 لعمليات بدون مستخدم)"""
+    try:
+        from_date, to_date = _report_period()
+    except ValueError:
+        return api_response(False, error='صيغة التاريخ غير صحيحة (YYYY-MM-DD)', status_code=400)
+
+    period = 'month' if request.args.get('period') == 'month' else 'day'
+
+    return api_response(True, data=get_user_timeline(user_id, from_date, to_date, period))
+
+
+@api_bp.route('/reports/pivot', methods=['GET'])
+@api_key_required
+def get_pivot_report():
+    """
+    جدول محوري من المكعب التحليلي في الذاكرة
+    ?fact=sales&dimensions=category,month&measures=revenue,profit&invoice_type=cash
+    """
+    fact = request.args.get('fact', 'sales')
+    dimensions = [d for d in request.args.get('dimensions', 'month').split(',') if d]
+    measures = [m for m in request.args.get('measures', '').split(',') if m] or None
+
+    try:
+        from_date = datetime.strptime(request.args['from'], '%Y-%m-%d').date() \
+            if request.args.get('from') else None
+        to_date = datetime.strptime(request.args['to'], '%Y-%m-%d').date() \
+            if request.args.get('to') else None
+    except ValueError:
+        return api_response(False, error='صيغة التاريخ غير صحيحة (YYYY-MM-DD)', status_code=400)
+
+    try:
+        result = analytics_cube.pivot(
+            fact, dimensions, measures, from_date=from_date, to_date=to_date,
+            filters=pivot_filters(fact, request.args)
+        )
+    except ValueError as e:
+        return api_response(False, error=str(e), status_code=400)
+
+    return api_response(True, data=result)
+
+
+@api_bp.route('/reports/cache', methods=['GET'])
+@api_key_required
+def get_report_cache_stats():
+    """إحصائيات ذاكرة التقارير والمكعب التحليلي ومفاتيح API لهذه العملية (للمراقبة)"""
+    from app.services.report_cache import report_cache
+    from app.services.api_key_cache import api_key_cache
+
+    return api_response(True, data=dict(report_cache.stats(),
+                                        analytics=analytics_cube.stats(),
+                                        api_keys=api_key_cache.stats()))
+
+
+# =============== مهام التقارير (Report Jobs) ===============
+
+def _report_job_data(job):
+    """بيانات المهمة مع روابط المتابعة والتنزيل"""
+    data = job.to_dict()
+    data['status_url'] = url_for('api.get_report_job', id=job.id)
+    data['download_url'] = url_for(
+        'api.download_report_job', id=job.id) if job.has_result else None
+    return data
+
+
+@api_bp.route('/reports/jobs', methods=['POST'])
+@api_key_required
+def create_report_job():
+    """تسجيل تقرير للتجهيز في الخلفية"""
+    data = request.get_json() or {}
+
+    try:
+        job = submit_job(
+            data.get('report'),
+            data.get('params') or {},
+            data.get('format', 'csv')
+        )
+    except ValueError as e:
+        return api_response(False, error=str(e), status_code=400)
+
+    return api_response(True, data=_report_job_data(job), status_code=202)
+
+
+@api_bp.route('/reports/jobs/<int:id>', methods=['GET'])
+@api_key_required
+def get_report_job(id):
+    """حالة مهمة تقرير"""
+    job = db.session.get(ReportJob, id)
+    if not job:
+        return api_response(False, error='المهمة غير موجودة', status_code=404)
+
+    return api_response(True, data=_report_job_data(job))
+
+
+@api_bp.route('/reports/jobs/<int:id>/download', methods=['GET'])
+@api_key_required
+def download_report_job(id):
+    """تنزيل نتيجة مهمة تقرير"""
+    job = db.session.get(ReportJob, id)
+    if not job:
+        return api_response(False, error='المهمة غير موجودة', status_code=404)
+
+    if not job.has_result:
+        return api_response(False, error='التقرير غير جاهز للتنزيل', status_code=409)
+
+    return send_file(job.result_path, as_attachment=True,
+                     download_name=job.download_name)
+
+
+# =============== التصدير (Export) ===============
+
+# المورد: (الحقول، عمود الفترة ?from= / ?to=، الفلاتر الإضافية)
+EXPORTS = {
+    'invoices': (INVOICE_FIELDS, Invoice.created_at, _filter_invoices),
+    'installments': (INSTALLMENT_FIELDS, Installment.due_date, _filter_installments),
+    'payments': (PAYMENT_FIELDS, Payment.payment_date, None),
+}
+
+
+@api_bp.route('/export/<entity>', methods=['GET'])
+@api_key_required
+def export_entity(entity):
+    """
+    تصدير كل الصفوف المطابقة كـ NDJSON (سطر JSON لكل صف) بدون تقسيم لصفحات.
+    الصفوف تُقرأ من مؤشر قاعدة البيانات على دفعات وتُرسل أثناء القراءة.
+    يدعم ?from= و ?to= (YYYY-MM-DD) و ?fields= وفلاتر القائمة (مثل ?status=).
+    """
+    if entity not in EXPORTS:
+        return api_response(False, error='المورد غير مدعوم للتصدير', status_code=404)
+
+    fieldset, date_column, filters = EXPORTS[entity]
+
+    try:
+        fields, include = fieldset.parse(request.args)
+        if include:
+            raise ValueError('الحقول المحسوبة (include) غير مدعومة في التصدير')
+        from_date = _parse_date_arg('from')
+        to_date = _parse_date_arg('to')
+    except ValueError as e:
+        return api_response(False, error=str(e), status_code=400)
+
+    query = fieldset.model.query
+    if filters:
+        query = filters(query, request.args)
+
+    if isinstance(date_column.type, db.DateTime):
+        query = query.filter(date_range_filter(date_column, from_date, to_date))
+    else:
+        if from_date:
+            query = query.filter(date_column >= from_date)
+        if to_date:
+            query = query.filter(date_column <= to_date)
+
+    return ndjson_response(fieldset.stream(query.order_by(fieldset.model.id), fields))
+
+
+def _parse_date_arg(name):
+    """تاريخ من معاملات الطلب (YYYY-MM-DD) أو None"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'تاريخ غير صالح: {value}')
+
+
 # =============== البحث (Search) ===============
 
 @api_bp.route('/search', methods=['GET'])
@@ -889,7 +1226,7 @@ def search():
 
     search_term = f'%{q}%'
 
-    products = Product.query.filter(
+    products = Product.query.options(*Product.load_options()).filter(
         db.and_(
             Product.is_active == True,
             db.or_(
@@ -909,7 +1246,7 @@ def search():
         )
     ).limit(10).all()
 
-    invoices = Invoice.query.filter(
+    invoices = Invoice.query.options(*Invoice.load_options()).filter(
         Invoice.invoice_number.ilike(search_term)
     ).limit(10).all()
 
@@ -917,7 +1254,118 @@ def search():
         'success': True,
         'data': {
             'products': [p.to_dict() for p in products],
-            'customers': [c.to_dict() for c in customers],
+            'customers': [c.to_dict() for c in Customer.preload_balances(customers)],
             'invoices': [i.to_dict() for i in invoices]
         }
     })
+
+
+# =============== الطلبات المجمعة (Batch) ===============
+
+# أقصى عدد طلبات فرعية في الدفعة الواحدة
+BATCH_MAX_REQUESTS = 20
+
+# أقصى عدد طلبات قراءة تُنفذ بالتوازي
+BATCH_MAX_WORKERS = 4
+
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+
+
+def _parse_batch_item(item):
+    """التحقق من طلب فرعي: (id، الطريقة، المسار، الاستعلام، الجسم، الـ headers)"""
+    if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+        raise ValueError('كل طلب يجب أن يحتوي على path')
+
+    method = str(item.get('method', 'GET')).upper()
+    if method not in BATCH_METHODS:
+        raise ValueError(f'طريقة غير مدعومة: {method}')
+
+    url = urlsplit(item['path'])
+    # مسارات /api/v2 فقط، وبدون دفعات متداخلة
+    batch_path = url_for('api.batch')
+    if not url.path.startswith(batch_path.rsplit('/', 1)[0] + '/') or url.path == batch_path:
+        raise ValueError(f'مسار غير مسموح: {url.path}')
+
+    headers = item.get('headers') or {}
+    if not isinstance(headers, dict):
+        raise ValueError('headers يجب أن تكون كائن')
+
+    return (item.get('id'), method, url.path, url.query, item.get('body'),
+            {str(k): str(v) for k, v in headers.items()})
+
+
+def _dispatch(app, item, key_data, base):
+    """تنفيذ طلب فرعي عبر خريطة المسارات بدون اتصال HTTP جديد"""
+    id, method, path, query, body, headers = item
+    environ = EnvironBuilder(
+        path=path, query_string=query, method=method, headers=headers,
+        json=body if method != 'GET' else None, base_url=base['url'],
+        environ_base={'REMOTE_ADDR': base['remote_addr'], BATCH_API_KEY_ENVIRON: key_data}
+    ).get_environ()
+
+    with app.request_context(environ):
+        try:
+            response = app.full_dispatch_request()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception('فشل طلب فرعي في الدفعة: %s %s', method, path)
+            return {'id': id, 'status': 500, 'body': {'success': False, 'error': 'خطأ في الخادم'}}
+
+    if response.is_json:
+        content = response.get_json()
+    elif response.mimetype.startswith('text/'):
+        content = response.get_data(as_text=True)
+    else:
+        content = None
+
+    result = {'id': id, 'status': response.status_code, 'body': content}
+    if content is None:
+        result['content_type'] = response.mimetype
+    if response.headers.get('ETag'):
+        result['etag'] = response.headers['ETag']
+    return result
+
+
+def _dispatch_in_context(app, item, key_data, base):
+    """تنفيذ طلب فرعي في خيط منفصل (جلسة قاعدة بيانات خاصة به)"""
+    with app.app_context():
+        return _dispatch(app, item, key_data, base)
+
+
+@api_bp.route('/batch', methods=['POST'])
+@api_key_required
+def batch():
+    """
+    تنفيذ عدة طلبات API في طلب واحد (تحقق واحد من المفتاح).
+    الجسم: {"requests": [{"id", "method", "path", "body", "headers"}], "parallel": bool}
+    parallel يُطبق فقط عندما تكون كل الطلبات GET، وإلا تُنفذ بالترتيب.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('requests') if isinstance(data, dict) else None
+
+    if not isinstance(items, list) or not items:
+        return api_response(False, error='بيانات غير صالحة', status_code=400)
+    if len(items) > BATCH_MAX_REQUESTS:
+        return api_response(
+            False, error=f'الحد الأقصى {BATCH_MAX_REQUESTS} طلب في الدفعة', status_code=400)
+
+    try:
+        items = [_parse_batch_item(item) for item in items]
+    except ValueError as e:
+        return api_response(False, error=str(e), status_code=400)
+
+    app = current_app._get_current_object()
+    base = {'url': request.host_url, 'remote_addr': request.remote_addr}
+    key_data = request.api_key
+
+    parallel = data.get('parallel') and len(items) > 1 and \
+        all(item[1] == 'GET' for item in items)
+
+    if parallel:
+        with ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(items))) as pool:
+            results = list(pool.map(
+                lambda item: _dispatch_in_context(app, item, key_data, base), items))
+    else:
+        results = [_dispatch(app, item, key_data, base) for item in items]
+
+    return api_response(True, data=results)
@@ -33,7 +33,7 @@ def index():
     query = query.order_by(Category.sort_order, Category.name)
 
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    categories = pagination.items
+    categories = Category.preload_products_count(pagination.items)
     all_categories = Category.query.order_by(
         Category.sort_order, Category.name).all()
 
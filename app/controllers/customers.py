@@ -34,7 +34,7 @@ def index():
     query = query.order_by(Customer.id.desc())
 
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    customers = pagination.items
+    customers = Customer.preload_balances(pagination.items)
 
     return render_template('customers/index.html',
                            page_title='إدارة العملاء',
@@ -1,15 +1,15 @@
 """
 متحكم لوحة التحكم
 """
-from datetime import date
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, Response
 from flask_login import login_required, current_user
-from app import db
 from app.models.invoice import Invoice
 from app.models.installment import Installment
 from app.models.payment import Payment
 from app.models.product import Product
 from app.models.customer import Customer
+from app.services.stats import get_today_sales_stats, get_dashboard_stats
+from app.services.live_stats import stats_publisher
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -18,23 +18,8 @@ dashboard_bp = Blueprint('dashboard', __name__)
 @login_required
 def index():
     """لوحة التحكم الرئيسية"""
-    # تحديث حالات الأقساط المتأخرة
-    Installment.update_overdue_status()
-
-    today = date.today()
-
     # إحصائيات اليوم
-    today_invoices = Invoice.query.filter(
-        db.func.date(Invoice.created_at) == today,
-        Invoice.status != 'cancelled'
-    ).all()
-
-    today_stats = {
-        'cash_count': len([i for i in today_invoices if i.invoice_type == 'cash']),
-        'cash_total': sum(float(i.total_amount) for i in today_invoices if i.invoice_type == 'cash'),
-        'installment_count': len([i for i in today_invoices if i.invoice_type == 'installment']),
-        'installment_total': sum(float(i.total_amount) for i in today_invoices if i.invoice_type == 'installment'),
-    }
+    today_stats = get_today_sales_stats()
 
     # إحصائيات المدفوعات
     today_payments = Payment.get_today_total()
@@ -46,7 +31,7 @@ def index():
     stats = {
         'products_count': Product.query.filter_by(is_active=True).count(),
         'customers_count': Customer.query.count(),
-        'low_stock_count': len(Product.get_low_stock()),
+        'low_stock_count': Product.count_low_stock(),
         'active_installments': Invoice.query.filter_by(
             invoice_type='installment',
             status='active'
@@ -57,7 +42,7 @@ def index():
     today_installments = Installment.get_today()
 
     # الأقساط المتأخرة
-    overdue_installments = Installment.get_overdue()[:5]
+    overdue_installments = Installment.get_overdue(limit=5)
 
     # آخر الفواتير
     recent_invoices = Invoice.query.order_by(Invoice.id.desc()).limit(5).all()
@@ -82,20 +67,16 @@ def index():
 @login_required
 def stats():
     """إحصائيات AJAX"""
-    today = date.today()
+    return jsonify(get_dashboard_stats())
 
-    today_invoices = Invoice.query.filter(
-        db.func.date(Invoice.created_at) == today,
-        Invoice.status != 'cancelled'
-    ).all()
 
-    return jsonify({
-        'today': {
-            'cash_count': len([i for i in today_invoices if i.invoice_type == 'cash']),
-            'cash_total': sum(float(i.total_amount) for i in today_invoices if i.invoice_type == 'cash'),
-            'installment_count': len([i for i in today_invoices if i.invoice_type == 'installment']),
-            'installment_total': sum(float(i.total_amount) for i in today_invoices if i.invoice_type == 'installment'),
-        },
-        'installments': Installment.get_stats(),
-        'payments': Payment.get_today_total()
-    })
+@dashboard_bp.route('/dashboard/stream')
+@login_required
+def stream():
+    """بث مباشر للإحصائيات (Server-Sent Events)"""
+    return Response(stats_publisher.stream(),
+                    mimetype='text/event-stream',
+                    headers={
+                        'Cache-Control': 'no-cache',
+                        'X-Accel-Buffering': 'no',
+                    })
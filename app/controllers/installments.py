@@ -21,7 +21,8 @@ def index():
     search = request.args.get('q', '')
     status = request.args.get('status', '')
 
-    query = Invoice.query.filter_by(invoice_type='installment')
+    query = Invoice.query.options(*Invoice.load_options()).filter_by(
+        invoice_type='installment')
 
     if search:
         from app.models.customer import Customer
@@ -39,7 +40,7 @@ def index():
     query = query.order_by(Invoice.id.desc())
 
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    invoices = pagination.items
+    invoices = Invoice.preload_installment_counts(pagination.items)
 
     return render_template('installments/index.html',
                            page_title='عقود التقسيط',
@@ -66,15 +67,11 @@ def today():
 @login_required
 def overdue():
     """الأقساط المتأخرة"""
-    # تحديث حالات الأقساط المتأخرة
-    Installment.update_overdue_status()
-
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
 
-    query = Installment.query.filter(
-        Installment.due_date < date.today(),
-        Installment.status.in_(['pending', 'partial', 'overdue'])
+    query = Installment.query.options(*Installment.load_options()).filter(
+        Installment.overdue_filter()
     ).order_by(Installment.due_date)
 
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
@@ -84,8 +81,7 @@ def overdue():
     total_overdue = db.session.query(
         db.func.coalesce(db.func.sum(Installment.remaining_amount), 0)
     ).filter(
-        Installment.due_date < date.today(),
-        Installment.status.in_(['pending', 'partial', 'overdue'])
+        Installment.overdue_filter()
     ).scalar()
 
     return render_template('installments/overdue.html',
@@ -154,7 +150,7 @@ def calendar():
     start_date = date(year, month, 1)
     end_date = date(year, month, days_in_month)
 
-    installments = Installment.query.filter(
+    installments = Installment.query.options(*Installment.load_options()).filter(
         Installment.due_date >= start_date,
         Installment.due_date <= end_date,
         Installment.status.in_(['pending', 'partial', 'overdue'])
@@ -12,6 +12,8 @@ from app.models.payment import Payment
 from app.models.product import Product
 from app.models.customer import Customer
 from app.models.activity_log import ActivityLog
+from app.models.daily_rollup import DailySalesRollup, DailyCollectionRollup
+from app.services.live_stats import stats_publisher
 from app.utils.decorators import admin_required
 
 invoices_bp = Blueprint('invoices', __name__)
@@ -27,7 +29,7 @@ def index():
     filter_type = request.args.get('type', '')
     status = request.args.get('status', '')
 
-    query = Invoice.query
+    query = Invoice.query.options(*Invoice.load_options())
 
     if search:
         search_term = f'%{search}%'
@@ -143,7 +145,8 @@ def store():
                 'product_name': product.name,
                 'quantity': qty,
                 'unit_price': price,
-                'total_price': total
+                'total_price': total,
+                'unit_cost': product.cost_price
             })
 
             # تقليل الكمية
@@ -219,6 +222,7 @@ def store():
                     notes='دفعة مقدمة'
                 )
                 db.session.add(payment)
+                DailyCollectionRollup.record_payment(payment)
         else:
             # دفعة للفاتورة النقدية
             receipt_number = f"RCP-{datetime.utcnow().strftime('%Y%m%d')}-{Payment.query.count():04d}"
@@ -231,8 +235,13 @@ def store():
                 notes='دفع نقدي كامل'
             )
             db.session.add(payment)
+            DailyCollectionRollup.record_payment(payment)
+
+        # تحديث جداول التجميع اليومي
+        DailySalesRollup.record_invoice(invoice)
 
         db.session.commit()
+        stats_publisher.request_refresh()
 
         ActivityLog.log(
             user_id=current_user.id,
@@ -280,7 +289,9 @@ def cancel(id):
             item.product.quantity += item.quantity
 
     invoice.status = 'cancelled'
+    DailySalesRollup.record_invoice(invoice, sign=-1)
     db.session.commit()
+    stats_publisher.request_refresh()
 
     ActivityLog.log(
         user_id=current_user.id,
@@ -4,10 +4,10 @@
 from datetime import date, datetime
 from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
-from app import db
 from app.models.payment import Payment
 from app.models.invoice import Invoice
 from app.models.activity_log import ActivityLog
+from app.utils.helpers import date_range_filter
 
 payments_bp = Blueprint('payments', __name__)
 
@@ -28,13 +28,9 @@ def index():
     to_date = datetime.strptime(
         to_date_str, '%Y-%m-%d').date() if to_date_str else None
 
-    query = Payment.query
-
-    if from_date:
-        query = query.filter(db.func.date(Payment.payment_date) >= from_date)
-
-    if to_date:
-        query = query.filter(db.func.date(Payment.payment_date) <= to_date)
+    query = Payment.query.options(*Payment.load_options()).filter(
+        date_range_filter(Payment.payment_date, from_date, to_date)
+    )
 
     query = query.order_by(Payment.payment_date.desc())
 
@@ -22,7 +22,7 @@ def index():
     search = request.args.get('q', '')
     category_id = request.args.get('category', type=int)
 
-    query = Product.query
+    query = Product.query.options(*Product.load_options())
 
     if search:
         search_term = f'%{search}%'
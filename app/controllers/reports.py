@@ -2,17 +2,39 @@
 متحكم التقارير
 """
 from datetime import date, datetime
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, url_for, send_file
 from flask_login import login_required, current_user
+from sqlalchemy.orm import contains_eager, joinedload
 from app import db
 from app.models.invoice import Invoice, InvoiceItem
-from app.models.payment import Payment
 from app.models.product import Product
 from app.models.installment import Installment
+from app.models.customer import Customer
+from app.models.daily_rollup import DailySalesRollup, DailyCollectionRollup
+from app.models.report_job import ReportJob
 from app.utils.decorators import admin_required
+from app.utils.export import EXPORT_FORMATS, export_response
+from app.services.report_exports import (
+    build_report_export, iter_report_rows, profits_query
+)
+from app.services.report_jobs import submit_job
+from app.services.report_cache import cached
+from app.services.aging import AGING_BUCKETS, get_aging_totals, get_aging_by_customer
+from app.services.forecast import get_forecast
+from app.services.performance import (
+    PERFORMANCE_SOURCES, get_user_performance, get_user_timeline
+)
+from app.services.analytics import (
+    FACT_DIMENSIONS, FACT_MEASURES, DIMENSION_LABELS, MEASURE_LABELS,
+    analytics_cube, crosstab, pivot_filters
+)
+from app.utils.pagination import SqlPagination
 
 reports_bp = Blueprint('reports', __name__)
 
+# عدد المنتجات المنخفضة المعروضة في تقرير المخزون
+LOW_STOCK_PREVIEW = 20
+
 
 def parse_date(date_str):
     """تحويل نص التاريخ إلى date object"""
@@ -21,6 +43,13 @@ def parse_date(date_str):
     return datetime.strptime(date_str, '%Y-%m-%d').date()
 
 
+def _export(report, export_format):
+    """تنزيل التقرير مباشرة كملف متدفق"""
+    headers, query, row = build_report_export(report, request.args)
+    return export_response(export_format, report, headers,
+                           iter_report_rows(query, row))
+
+
 @reports_bp.route('/')
 @login_required
 def index():
@@ -43,92 +72,58 @@ def profits():
     from_date = parse_date(from_date_str)
     to_date = parse_date(to_date_str)
 
-    # جلب الفواتير المكتملة
-    query = db.session.query(
-        InvoiceItem.product_id,
-        InvoiceItem.product_name,
-        db.func.sum(InvoiceItem.quantity).label('total_qty'),
-        db.func.sum(InvoiceItem.total_price).label('revenue'),
-        Product.cost_price
-    ).join(Invoice).outerjoin(
-        Product, InvoiceItem.product_id == Product.id
-    ).filter(
-        db.func.date(Invoice.created_at) >= from_date,
-        db.func.date(Invoice.created_at) <= to_date,
-        Invoice.status != 'cancelled'
-    ).group_by(
-        InvoiceItem.product_id,
-        InvoiceItem.product_name,
-        Product.cost_price
-    )
-
-    # الحصول على جميع النتائج لحساب الإجماليات
-    all_results = query.all()
-
-    # حساب الإجماليات من جميع البيانات
-    total_revenue = 0
-    total_cost = 0
-    total_profit = 0
-
-    for r in all_results:
-        revenue = float(r.revenue or 0)
-        cost = float(r.cost_price or 0) * float(r.total_qty)
-        profit = revenue - cost
-        total_revenue += revenue
-        total_cost += cost
-        total_profit += profit
-
-    # Pagination يدوي
-    total_items = len(all_results)
-    total_pages = (total_items + per_page - 1) // per_page
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
-    page_results = all_results[start_idx:end_idx]
-
-    # حساب الأرباح للصفحة الحالية
-    profits = []
-    for r in page_results:
-        revenue = float(r.revenue or 0)
-        cost = float(r.cost_price or 0) * float(r.total_qty)
-        profit = revenue - cost
-
-        profits.append({
-            'product_name': r.product_name,
-            'quantity': r.total_qty,
-            'revenue': revenue,
-            'cost': cost,
-            'profit': profit
-        })
-
-    # إنشاء كائن pagination مخصص
-    class Pagination:
-        def __init__(self, page, per_page, total, items):
-            self.page = page
-            self.per_page = per_page
-            self.total = total
-            self.items = items
-            self.pages = (total + per_page - 1) // per_page if total > 0 else 1
-            self.has_prev = page > 1
-            self.has_next = page < self.pages
-            self.prev_num = page - 1 if self.has_prev else None
-            self.next_num = page + 1 if self.has_next else None
-
-        def iter_pages(self, left_edge=2, left_current=2, right_current=3, right_edge=2):
-            last = 0
-            for num in range(1, self.pages + 1):
-                if num <= left_edge or \
-                   (num >= self.page - left_current and num <= self.page + right_current) or \
-                   num > self.pages - right_edge:
-                    if last + 1 != num:
-                        yield None
-                    yield num
-                    last = num
-
-    pagination = Pagination(page, per_page, total_items, profits)
+    # الأرباح لكل منتج (مجمعة في قاعدة البيانات)
+    query = profits_query(from_date, to_date)
+
+    export_format = request.args.get('format')
+    if export_format in EXPORT_FORMATS:
+        return _export('profits', export_format)
+
+    def build():
+        # الإجماليات وعدد المجموعات في استعلام مرافق واحد
+        grouped = query.subquery()
+        totals = db.session.query(
+            db.func.count(),
+            db.func.coalesce(db.func.sum(grouped.c.revenue), 0),
+            db.func.coalesce(db.func.sum(grouped.c.cost), 0)
+        ).select_from(grouped).one()
+
+        # الصفحة الحالية فقط (LIMIT/OFFSET)
+        pagination = SqlPagination(
+            query.order_by(db.desc('revenue'), InvoiceItem.product_id),
+            page, per_page, total=totals[0]
+        )
+
+        profits = []
+        for r in pagination.items:
+            row_revenue = float(r.revenue or 0)
+            row_cost = float(r.cost or 0)
+
+            profits.append({
+                'product_name': r.product_name,
+                'quantity': r.total_qty,
+                'revenue': row_revenue,
+                'cost': row_cost,
+                'profit': row_revenue - row_cost
+            })
+        pagination.items = profits
+
+        return {
+            'pagination': pagination,
+            'total_revenue': float(totals[1]),
+            'total_cost': float(totals[2]),
+        }
+
+    result = cached('profits', (from_date.isoformat(), to_date.isoformat(),
+                                page, per_page), build)
+    pagination = result['pagination']
+    total_revenue = result['total_revenue']
+    total_cost = result['total_cost']
+    total_profit = total_revenue - total_cost
 
     return render_template('reports/profits.html',
                            page_title='تقرير الأرباح',
-                           profits=profits,
+                           profits=pagination.items,
                            pagination=pagination,
                            from_date=from_date_str,
                            to_date=to_date_str,
@@ -149,33 +144,31 @@ def sales():
     from_date = parse_date(from_date_str)
     to_date = parse_date(to_date_str)
 
-    # إحصائيات المبيعات
-    invoices = Invoice.query.filter(
-        db.func.date(Invoice.created_at) >= from_date,
-        db.func.date(Invoice.created_at) <= to_date,
-        Invoice.status != 'cancelled'
-    ).all()
-
-    cash_total = sum(float(i.total_amount)
-                     for i in invoices if i.invoice_type == 'cash')
-    installment_total = sum(float(i.total_amount)
-                            for i in invoices if i.invoice_type == 'installment')
-
-    # المبيعات اليومية
-    daily_sales = db.session.query(
-        db.func.date(Invoice.created_at).label('date'),
-        db.func.sum(Invoice.total_amount).label('total')
-    ).filter(
-        db.func.date(Invoice.created_at) >= from_date,
-        db.func.date(Invoice.created_at) <= to_date,
-        Invoice.status != 'cancelled'
-    ).group_by(
-        db.func.date(Invoice.created_at)
-    ).order_by('date').all()
+    export_format = request.args.get('format')
+    if export_format in EXPORT_FORMATS:
+        return _export('sales', export_format)
+
+    def build():
+        # إحصائيات المبيعات (من جدول التجميع اليومي)
+        by_type = DailySalesRollup.get_totals_by_type(from_date, to_date)
+
+        # المبيعات اليومية
+        daily_sales = [
+            {'date': r.date, 'total': r.total}
+            for r in DailySalesRollup.get_daily_totals(from_date, to_date)
+        ]
+        return by_type, daily_sales
+
+    by_type, daily_sales = cached(
+        'sales', (from_date.isoformat(), to_date.isoformat()), build)
+
+    cash_total = by_type.get('cash', {'total': 0})['total']
+    installment_total = by_type.get('installment', {'total': 0})['total']
+    invoices_count = sum(t['count'] for t in by_type.values())
 
     return render_template('reports/sales.html',
                            page_title='تقرير المبيعات',
-                           invoices=invoices,
+                           invoices_count=invoices_count,
                            cash_total=cash_total,
                            installment_total=installment_total,
                            daily_sales=daily_sales,
@@ -195,24 +188,28 @@ def collections():
     from_date = parse_date(from_date_str)
     to_date = parse_date(to_date_str)
 
-    payments = Payment.get_by_date_range(from_date, to_date)
-    total = Payment.get_total_by_date_range(from_date, to_date)
+    export_format = request.args.get('format')
+    if export_format in EXPORT_FORMATS:
+        return _export('collections', export_format)
 
-    # التحصيل اليومي
-    daily_collections = db.session.query(
-        db.func.date(Payment.payment_date).label('date'),
-        db.func.sum(Payment.amount).label('total')
-    ).filter(
-        db.func.date(Payment.payment_date) >= from_date,
-        db.func.date(Payment.payment_date) <= to_date
-    ).group_by(
-        db.func.date(Payment.payment_date)
-    ).order_by('date').all()
+    def build():
+        # إجمالي التحصيل (من جدول التجميع اليومي)
+        totals = DailyCollectionRollup.get_totals(from_date, to_date)
+
+        # التحصيل اليومي
+        daily_collections = [
+            {'date': r.date, 'total': r.total}
+            for r in DailyCollectionRollup.get_daily_totals(from_date, to_date)
+        ]
+        return totals, daily_collections
+
+    totals, daily_collections = cached(
+        'collections', (from_date.isoformat(), to_date.isoformat()), build)
 
     return render_template('reports/collections.html',
                            page_title='تقرير التحصيل',
-                           payments=payments,
-                           total=total,
+                           payments_count=totals['count'],
+                           total=totals['total'],
                            daily_collections=daily_collections,
                            from_date=from_date_str,
                            to_date=to_date_str
@@ -226,62 +223,65 @@ def overdue():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
 
-    # تحديث حالات الأقساط المتأخرة
-    Installment.update_overdue_status()
-
-    installments = Installment.get_overdue()
-
-    # تجميع حسب العميل
-    customers_data = {}
-    for inst in installments:
-        customer = inst.invoice.customer
-        if customer:
-            if customer.id not in customers_data:
-                customers_data[customer.id] = {
-                    'customer': customer,
-                    'installments': [],
-                    'total': 0
-                }
-            customers_data[customer.id]['installments'].append(inst)
-            customers_data[customer.id]['total'] += float(
-                inst.remaining_amount or inst.amount)
-
-    total_overdue = sum(c['total'] for c in customers_data.values())
-    all_customers = list(customers_data.values())
-
-    # Pagination يدوي
-    total_items = len(all_customers)
-    total_pages = (total_items + per_page -
-                   1) // per_page if total_items > 0 else 1
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
-    page_customers = all_customers[start_idx:end_idx]
-
-    # إنشاء كائن pagination مخصص
-    class Pagination:
-        def __init__(self, p, pp, total, items):
-            self.page = p
-            self.per_page = pp
-            self.total = total
-            self.items = items
-            self.pages = (total + pp - 1) // pp if total > 0 else 1
-            self.has_prev = p > 1
-            self.has_next = p < self.pages
-            self.prev_num = p - 1 if self.has_prev else None
-            self.next_num = p + 1 if self.has_next else None
-
-        def iter_pages(self, left_edge=2, left_current=2, right_current=3, right_edge=2):
-            last = 0
-            for num in range(1, self.pages + 1):
-                if num <= left_edge or \
-                   (num >= self.page - left_current and num <= self.page + right_current) or \
-                   num > self.pages - right_edge:
-                    if last + 1 != num:
-                        yield None
-                    yield num
-                    last = num
-
-    pagination = Pagination(page, per_page, total_items, page_customers)
+    due_amount = Installment.due_amount_expr()
+
+    export_format = request.args.get('format')
+    if export_format in EXPORT_FORMATS:
+        return _export('overdue', export_format)
+
+    # إجمالي المتأخرات لكل عميل (مجمعة في قاعدة البيانات)
+    query = db.session.query(
+        Invoice.customer_id,
+        db.func.sum(due_amount).label('total'),
+        db.func.count(Installment.id).label('installments_count')
+    ).select_from(Installment).join(
+        Invoice, Installment.invoice_id == Invoice.id
+    ).filter(
+        Installment.overdue_filter(),
+        Invoice.customer_id.isnot(None)
+    ).group_by(Invoice.customer_id)
+
+    grouped = query.subquery()
+    totals = db.session.query(
+        db.func.count(),
+        db.func.coalesce(db.func.sum(grouped.c.total), 0)
+    ).select_from(grouped).one()
+
+    total_items = totals[0]
+    total_overdue = float(totals[1])
+
+    # الأقدم تأخيراً أولاً
+    pagination = SqlPagination(
+        query.order_by(db.func.min(Installment.due_date), Invoice.customer_id),
+        page, per_page, total=total_items
+    )
+
+    # جلب عملاء وأقساط الصفحة الحالية فقط
+    customer_ids = [row.customer_id for row in pagination.items]
+    customers = {c.id: c for c in Customer.query.filter(
+        Customer.id.in_(customer_ids)).all()} if customer_ids else {}
+
+    page_installments = Installment.query.join(
+        Invoice, Installment.invoice_id == Invoice.id
+    ).options(
+        contains_eager(Installment.invoice)
+    ).filter(
+        Installment.overdue_filter(),
+        Invoice.customer_id.in_(customer_ids)
+    ).order_by(Installment.due_date).all() if customer_ids else []
+
+    installments_by_customer = {}
+    for inst in page_installments:
+        installments_by_customer.setdefault(
+            inst.invoice.customer_id, []).append(inst)
+
+    page_customers = [{
+        'customer': customers[row.customer_id],
+        'installments': installments_by_customer.get(row.customer_id, []),
+        'total': float(row.total or 0),
+        'installments_count': row.installments_count
+    } for row in pagination.items]
+    pagination.items = page_customers
 
     return render_template('reports/overdue.html',
                            page_title='تقرير الأقساط المتأخرة',
@@ -292,19 +292,226 @@ def overdue():
                            )
 
 
+@reports_bp.route('/aging')
+@login_required
+def aging():
+    """تقرير أعمار الذمم (شرائح التأخير)"""
+    page = request.args.get('page', 1, type=int)
+    per_page = min(100, request.args.get('per_page', 20, type=int))
+
+    return render_template('reports/aging.html',
+                           page_title='تقرير أعمار الذمم',
+                           buckets=AGING_BUCKETS,
+                           totals=get_aging_totals(),
+                           pagination=get_aging_by_customer(page, per_page)
+                           )
+
+
+@reports_bp.route('/forecast')
+@login_required
+def forecast():
+    """توقع التدفق النقدي من الأقساط القادمة"""
+    period = request.args.get('period', 'week')
+    apply_rates = request.args.get('rates') == '1'
+
+    return render_template('reports/forecast.html',
+                           page_title='توقع التحصيل',
+                           forecast=get_forecast(period, apply_rates=apply_rates),
+                           apply_rates=apply_rates
+                           )
+
+
+@reports_bp.route('/performance')
+@admin_required
+def performance():
+    """تقرير أداء الموظفين (المبيعات والتحصيل لكل مستخدم)"""
+    from_date_str = request.args.get(
+        'from', date.today().replace(day=1).isoformat())
+    to_date_str = request.args.get('to', date.today().isoformat())
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    source = request.args.get('source', 'rollup')
+    if source not in PERFORMANCE_SOURCES:
+        source = 'rollup'
+
+    from_date = parse_date(from_date_str)
+    to_date = parse_date(to_date_str)
+
+    pagination = get_user_performance(
+        from_date, to_date, page, per_page, source=source)
+
+    # تفاصيل مستخدم واحد لكل يوم أو شهر
+    user_id = request.args.get('user_id', type=int)
+    period = 'month' if request.args.get('period') == 'month' else 'day'
+    timeline = get_user_timeline(
+        user_id, from_date, to_date, period) if user_id is not None else None
+
+    return render_template('reports/performance.html',
+                           page_title='أداء الموظفين',
+                           users=pagination.items,
+                           pagination=pagination,
+                           timeline=timeline,
+                           selected_user_id=user_id,
+                           period=period,
+                           source=source,
+                           from_date=from_date_str,
+                           to_date=to_date_str
+                           )
+
+
+@reports_bp.route('/pivot')
+@login_required
+def pivot():
+    """جدول محوري على المكعب التحليلي (المبيعات / التحصيل)"""
+    fact = request.args.get('fact', 'sales')
+    if fact not in FACT_DIMENSIONS:
+        fact = 'sales'
+    dimensions = FACT_DIMENSIONS[fact]
+
+    # التكلفة والربح للمدير فقط (مثل تقرير الأرباح)
+    measures = [m for m in FACT_MEASURES[fact]
+                if current_user.is_admin() or m not in ('cost', 'profit')]
+    measure = request.args.get('measure')
+    if measure not in measures:
+        measure = 'revenue' if fact == 'sales' else 'amount'
+
+    rows = [d for d in request.args.getlist('rows') if d in dimensions][:2] or ['month']
+    column = request.args.get('column')
+    if column not in dimensions or column in rows:
+        column = None
+
+    from_date_str = request.args.get('from', '')
+    to_date_str = request.args.get('to', '')
+
+    result = analytics_cube.pivot(
+        fact, rows + ([column] if column else []), [measure],
+        from_date=parse_date(from_date_str),
+        to_date=parse_date(to_date_str),
+        filters=pivot_filters(fact, request.args)
+    )
+
+    if column:
+        column_values, table = crosstab(result, column, measure)
+    else:
+        column_values = []
+        table = [(tuple(r[d] for d in rows), {}, r[measure]) for r in result['records']]
+
+    return render_template('reports/pivot.html',
+                           page_title='الجدول المحوري',
+                           fact=fact,
+                           dimensions=dimensions,
+                           dimension_labels=DIMENSION_LABELS,
+                           measures=measures,
+                           measure_labels=MEASURE_LABELS,
+                           measure=measure,
+                           rows=rows,
+                           column=column,
+                           column_values=column_values,
+                           table=table,
+                           result=result,
+                           from_date=from_date_str,
+                           to_date=to_date_str
+                           )
+
+
 @reports_bp.route('/inventory')
 @login_required
 def inventory():
     """تقرير المخزون"""
-    products = Product.query.filter_by(
-        is_active=True).order_by(Product.name).all()
+    export_format = request.args.get('format')
+    if export_format in EXPORT_FORMATS:
+        return _export('inventory', export_format)
 
-    low_stock = [p for p in products if p.is_low_stock]
-    total_value = sum(float(p.cost_price or 0) * p.quantity for p in products)
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)
+
+    # الإجماليات لكل تصنيف (مجمعة في قاعدة البيانات)
+    categories = Product.get_inventory_by_category()
+    total_value = sum(float(c.total_value) for c in categories)
+    products_count = sum(c.products_count for c in categories)
+    low_stock_count = sum(c.low_stock_count for c in categories)
+
+    # أول المنتجات المنخفضة فقط (من الفهرس الجزئي)
+    low_stock = Product.get_low_stock(limit=LOW_STOCK_PREVIEW)
+
+    # الصفحة الحالية فقط (العدد معروف من الإجماليات)
+    pagination = SqlPagination(
+        Product.query.options(
+            joinedload(Product.category)
+        ).filter_by(
+            is_active=True
+        ).order_by(Product.name, Product.id),
+        page, per_page, total=products_count
+    )
 
     return render_template('reports/inventory.html',
                            page_title='تقرير المخزون',
-                           products=products,
+                           products=pagination.items,
+                           pagination=pagination,
+                           categories=categories,
+                           products_count=products_count,
                            low_stock=low_stock,
+                           low_stock_count=low_stock_count,
                            total_value=total_value
                            )
+
+
+# =============== التقارير في الخلفية ===============
+
+def _job_response(job):
+    """حالة المهمة مع روابط المتابعة والتنزيل"""
+    data = job.to_dict()
+    data['status_url'] = url_for('reports.job_status', id=job.id)
+    data['download_url'] = url_for(
+        'reports.job_download', id=job.id) if job.has_result else None
+    return jsonify({'success': True, 'job': data})
+
+
+def _get_user_job(id):
+    """المهمة إذا كانت للمستخدم الحالي (أو للمدير)"""
+    job = db.session.get(ReportJob, id)
+    if not job or (job.created_by != current_user.id and not current_user.is_admin()):
+        return None
+    return job
+
+
+@reports_bp.route('/jobs', methods=['POST'])
+@login_required
+def create_job():
+    """تجهيز تقرير في الخلفية بدلاً من التنزيل المباشر"""
+    data = request.get_json(silent=True) or request.form
+    report = data.get('report')
+
+    if report == 'profits' and not current_user.is_admin():
+        return jsonify({'success': False, 'message': 'ليس لديك صلاحية لهذا الإجراء'}), 403
+
+    try:
+        job = submit_job(report, data, data.get('format', 'csv'),
+                         user_id=current_user.id)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    return _job_response(job), 202
+
+
+@reports_bp.route('/jobs/<int:id>')
+@login_required
+def job_status(id):
+    """حالة مهمة تقرير (للمتابعة الدورية)"""
+    job = _get_user_job(id)
+    if not job:
+        return jsonify({'success': False, 'message': 'المهمة غير موجودة'}), 404
+
+    return _job_response(job)
+
+
+@reports_bp.route('/jobs/<int:id>/download')
+@login_required
+def job_download(id):
+    """تنزيل نتيجة مهمة تقرير"""
+    job = _get_user_job(id)
+    if not job or not job.has_result:
+        return jsonify({'success': False, 'message': 'التقرير غير جاهز للتنزيل'}), 404
+
+    return send_file(job.result_path, as_attachment=True,
+                     download_name=job.download_name)
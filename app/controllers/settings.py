@@ -276,7 +276,8 @@ def export_database_to_json(filepath):
             'product_name': item.product_name,
             'quantity': item.quantity,
             'unit_price': float(item.unit_price) if item.unit_price else 0,
-            'total_price': float(item.total_price) if item.total_price else 0
+            'total_price': float(item.total_price) if item.total_price else 0,
+            'unit_cost': float(item.unit_cost) if item.unit_cost is not None else None
         })
 
     # تصدير الأقساط
@@ -445,7 +446,7 @@ def activity_log():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
 
-    pagination = ActivityLog.query.order_by(
+    pagination = ActivityLog.query.options(*ActivityLog.load_options()).order_by(
         ActivityLog.created_at.desc()
     ).paginate(page=page, per_page=per_page, error_out=False)
 
@@ -472,6 +473,13 @@ def api_docs():
 def api_keys():
     """إدارة مفاتيح API"""
     from app.models.api_key import ApiKey
+    from app.services.api_key_cache import api_key_cache
+
+    # كتابة آخر استخدام المعلق قبل العرض (فشلها لا يمنع عرض الصفحة)
+    try:
+        api_key_cache.flush()
+    except Exception:
+        current_app.logger.exception('فشل تحديث آخر استخدام لمفاتيح API')
 
     keys = ApiKey.query.order_by(ApiKey.created_at.desc()).all()
     new_key = request.args.get('new_key')
@@ -533,6 +541,7 @@ def api_key_create():
 def api_key_toggle(id):
     """تفعيل/تعطيل مفتاح API"""
     from app.models.api_key import ApiKey
+    from app.services.api_key_cache import api_key_cache
 
     api_key = ApiKey.query.get(id)
 
@@ -542,6 +551,7 @@ def api_key_toggle(id):
     try:
         api_key.is_active = not api_key.is_active
         db.session.commit()
+        api_key_cache.invalidate(api_key.api_key, api_key.id)
 
         action = 'تفعيل' if api_key.is_active else 'تعطيل'
         ActivityLog.log(
@@ -565,6 +575,7 @@ def api_key_toggle(id):
 def api_key_delete(id):
     """حذف مفتاح API"""
     from app.models.api_key import ApiKey
+    from app.services.api_key_cache import api_key_cache
 
     api_key = ApiKey.query.get(id)
 
@@ -573,8 +584,10 @@ def api_key_delete(id):
 
     try:
         name = api_key.name
+        key, key_id = api_key.api_key, api_key.id
         db.session.delete(api_key)
         db.session.commit()
+        api_key_cache.invalidate(key, key_id)
 
         ActivityLog.log(
             user_id=current_user.id,
@@ -11,6 +11,8 @@ from app.models.payment import Payment
 from app.models.setting import Setting
 from app.models.api_key import ApiKey
 from app.models.activity_log import ActivityLog
+from app.models.daily_rollup import DailySalesRollup, DailyCollectionRollup
+from app.models.report_job import ReportJob
 
 __all__ = [
     'User',
@@ -24,4 +26,7 @@ __all__ = [
     'Setting',
     'ApiKey',
     'ActivityLog',
+    'DailySalesRollup',
+    'DailyCollectionRollup',
+    'ReportJob',
 ]
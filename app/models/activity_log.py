@@ -2,6 +2,7 @@
 نموذج سجل النشاط
 """
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 from app import db
 
 
@@ -18,6 +19,11 @@ class ActivityLog(db.Model):
     ip_address = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    @classmethod
+    def load_options(cls):
+        """تحميل المستخدم مع سجلات النشاط (ما يحتاجه to_dict والقوائم)"""
+        return (joinedload(cls.user),)
+
     @classmethod
     def log(cls, user_id, action, entity_type=None, entity_id=None, description=None, ip_address=None):
         """تسجيل نشاط"""
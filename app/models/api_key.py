@@ -42,21 +42,9 @@ class ApiKey(db.Model):
 
     @classmethod
     def validate(cls, key):
-        """التحقق من صلاحية المفتاح"""
-        api_key = cls.query.filter_by(api_key=key, is_active=True).first()
-
-        if not api_key:
-            return None
-
-        # التحقق من انتهاء الصلاحية
-        if api_key.expires_at and api_key.expires_at < datetime.utcnow():
-            return None
-
-        # تحديث آخر استخدام
-        api_key.last_used_at = datetime.utcnow()
-        db.session.commit()
-
-        return api_key
+        """التحقق من صلاحية المفتاح (من ذاكرة المفاتيح، وآخر استخدام يُكتب دورياً)"""
+        from app.services.api_key_cache import api_key_cache
+        return api_key_cache.validate(key)
 
     @property
     def is_expired(self):
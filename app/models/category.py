@@ -19,7 +19,7 @@ class Category(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(
-        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # العلاقات
     products = db.relationship('Product', backref='category', lazy='dynamic')
@@ -28,13 +28,36 @@ class Category(db.Model):
 
     @property
     def products_count(self):
-        """عدد المنتجات في التصنيف"""
+        """عدد المنتجات في التصنيف (المحمل مسبقاً إن وجد)"""
+        if '_products_count' in self.__dict__:
+            return self._products_count
         return self.products.count()
 
+    @classmethod
+    def get_products_counts(cls, ids):
+        """عدد المنتجات لعدة تصنيفات في استعلام تجميعي واحد"""
+        from app.models.product import Product
+
+        counts = dict(db.session.query(
+            Product.category_id, db.func.count(Product.id)
+        ).filter(
+            Product.category_id.in_(ids)
+        ).group_by(Product.category_id).all()) if ids else {}
+        return {id: counts.get(id, 0) for id in ids}
+
+    @classmethod
+    def preload_products_count(cls, categories):
+        """عدد المنتجات لكل التصنيفات في استعلام واحد بدلاً من استعلام لكل تصنيف"""
+        counts = cls.get_products_counts([c.id for c in categories])
+        for category in categories:
+            category._products_count = counts[category.id]
+        return categories
+
     @classmethod
     def get_all_with_count(cls):
         """جلب التصنيفات مع عدد المنتجات"""
-        return cls.query.order_by(cls.sort_order, cls.name).all()
+        return cls.preload_products_count(
+            cls.query.order_by(cls.sort_order, cls.name).all())
 
     def to_dict(self):
         """تحويل لـ Dictionary"""
@@ -35,6 +35,8 @@ class Customer(db.Model):
     @property
     def balance(self):
         """الرصيد المستحق"""
+        if '_balances' in self.__dict__:
+            return self._balances[0]
         from app.models.invoice import Invoice
         result = db.session.query(
             db.func.coalesce(db.func.sum(Invoice.remaining_amount), 0)
@@ -47,8 +49,35 @@ class Customer(db.Model):
     @property
     def active_invoices_count(self):
         """عدد الفواتير النشطة"""
+        if '_balances' in self.__dict__:
+            return self._balances[1]
         return self.invoices.filter_by(status='active').count()
 
+    @classmethod
+    def get_balances(cls, ids):
+        """الرصيد وعدد الفواتير النشطة لعدة عملاء في استعلام تجميعي واحد"""
+        from app.models.invoice import Invoice
+
+        rows = db.session.query(
+            Invoice.customer_id,
+            db.func.coalesce(db.func.sum(Invoice.remaining_amount), 0),
+            db.func.count(Invoice.id)
+        ).filter(
+            Invoice.customer_id.in_(ids),
+            Invoice.status == 'active'
+        ).group_by(Invoice.customer_id).all() if ids else []
+
+        balances = {customer_id: (float(total), count) for customer_id, total, count in rows}
+        return {id: balances.get(id, (0, 0)) for id in ids}
+
+    @classmethod
+    def preload_balances(cls, customers):
+        """تحميل الرصيد وعدد الفواتير النشطة لقائمة عملاء (بدلاً من استعلامين لكل عميل)"""
+        balances = cls.get_balances([c.id for c in customers])
+        for customer in customers:
+            customer._balances = balances[customer.id]
+        return customers
+
     @classmethod
     def search(cls, query, limit=20):
         """بحث في العملاء"""
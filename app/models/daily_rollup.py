@@ -0,0 +1,215 @@
+"""
+جداول التجميع اليومي للمبيعات والتحصيل
+"""
+from datetime import datetime
+from app import db
+
+# إعداد يتغير مع كل إعادة بناء (ذاكرة التقارير تقارنه لتلتقط إعادة البناء من أي عملية)
+ROLLUP_VERSION_KEY = 'rollups_version'
+
+
+def _bump_version():
+    """تغيير نسخة جداول التجميع داخل نفس المعاملة"""
+    from app.models.setting import Setting
+
+    version = datetime.utcnow().isoformat()
+    setting = Setting.query.filter_by(setting_key=ROLLUP_VERSION_KEY).first()
+    if setting:
+        setting.setting_value = version
+    else:
+        db.session.add(Setting(setting_key=ROLLUP_VERSION_KEY,
+                               setting_value=version, setting_group='system'))
+
+
+def _upsert_increment(model, keys, values):
+    """زيادة عدادات صف التجميع (أو إنشاؤه) داخل نفس المعاملة"""
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        row = model.query.filter_by(**keys).with_for_update().first()
+        if row:
+            for column, value in values.items():
+                setattr(row, column, getattr(row, column) + value)
+        else:
+            db.session.add(model(**keys, **values))
+        return
+
+    stmt = insert(model).values(**keys, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: getattr(model, column) + stmt.excluded[column]
+              for column in values}
+    )
+    db.session.execute(stmt)
+
+
+class DailySalesRollup(db.Model):
+    """إجمالي المبيعات اليومية لكل نوع فاتورة ومستخدم"""
+    __tablename__ = 'daily_sales_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'invoice_type', 'user_id',
+                            name='uq_daily_sales_rollup_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    invoice_type = db.Column(db.String(20), nullable=False)
+    # 0 = فواتير بدون مستخدم (API)
+    user_id = db.Column(db.Integer, nullable=False, default=0)
+    invoices_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    @classmethod
+    def record_invoice(cls, invoice, sign=1):
+        """إضافة فاتورة للتجميع (sign=-1 عند الإلغاء)"""
+        day = (invoice.created_at or datetime.utcnow()).date()
+        _upsert_increment(cls, {
+            'day': day,
+            'invoice_type': invoice.invoice_type,
+            'user_id': invoice.user_id or 0,
+        }, {
+            'invoices_count': sign,
+            'total_amount': sign * float(invoice.total_amount or 0),
+        })
+
+    @classmethod
+    def get_totals_by_type(cls, from_date, to_date):
+        """عدد وإجمالي المبيعات لكل نوع خلال فترة"""
+        rows = db.session.query(
+            cls.invoice_type,
+            db.func.sum(cls.invoices_count).label('count'),
+            db.func.sum(cls.total_amount).label('total')
+        ).filter(
+            cls.day >= from_date,
+            cls.day <= to_date
+        ).group_by(cls.invoice_type).all()
+
+        return {
+            row.invoice_type: {'count': int(row.count or 0),
+                               'total': float(row.total or 0)}
+            for row in rows
+        }
+
+    @classmethod
+    def get_daily_totals(cls, from_date, to_date):
+        """إجمالي المبيعات لكل يوم خلال فترة"""
+        return db.session.query(
+            cls.day.label('date'),
+            db.func.sum(cls.total_amount).label('total')
+        ).filter(
+            cls.day >= from_date,
+            cls.day <= to_date
+        ).group_by(cls.day).having(
+            db.func.sum(cls.invoices_count) > 0
+        ).order_by(cls.day).all()
+
+    @classmethod
+    def rebuild(cls):
+        """إعادة بناء الجدول من الفواتير"""
+        from app.models.invoice import Invoice
+
+        day = db.func.date(Invoice.created_at)
+        user_id = db.func.coalesce(Invoice.user_id, 0)
+        source = db.select(
+            day,
+            Invoice.invoice_type,
+            user_id,
+            db.func.count(Invoice.id),
+            db.func.coalesce(db.func.sum(Invoice.total_amount), 0)
+        ).where(
+            Invoice.status != 'cancelled'
+        ).group_by(day, Invoice.invoice_type, user_id)
+
+        db.session.execute(db.delete(cls))
+        db.session.execute(db.insert(cls).from_select(
+            ['day', 'invoice_type', 'user_id', 'invoices_count', 'total_amount'],
+            source
+        ))
+        _bump_version()
+
+    def __repr__(self):
+        return f'<DailySalesRollup {self.day} {self.invoice_type}>'
+
+
+class DailyCollectionRollup(db.Model):
+    """إجمالي التحصيل اليومي لكل طريقة دفع ومستخدم"""
+    __tablename__ = 'daily_collection_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'payment_method', 'user_id',
+                            name='uq_daily_collection_rollup_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    payment_method = db.Column(db.String(20), nullable=False)
+    # 0 = مدفوعات بدون مستخدم (API)
+    user_id = db.Column(db.Integer, nullable=False, default=0)
+    payments_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    @classmethod
+    def record_payment(cls, payment):
+        """إضافة دفعة للتجميع"""
+        day = (payment.payment_date or datetime.utcnow()).date()
+        _upsert_increment(cls, {
+            'day': day,
+            'payment_method': payment.payment_method or 'cash',
+            'user_id': payment.user_id or 0,
+        }, {
+            'payments_count': 1,
+            'total_amount': float(payment.amount or 0),
+        })
+
+    @classmethod
+    def get_totals(cls, from_date, to_date):
+        """عدد وإجمالي التحصيل خلال فترة"""
+        row = db.session.query(
+            db.func.coalesce(db.func.sum(cls.payments_count), 0).label('count'),
+            db.func.coalesce(db.func.sum(cls.total_amount), 0).label('total')
+        ).filter(
+            cls.day >= from_date,
+            cls.day <= to_date
+        ).one()
+
+        return {'count': int(row.count), 'total': float(row.total)}
+
+    @classmethod
+    def get_daily_totals(cls, from_date, to_date):
+        """إجمالي التحصيل لكل يوم خلال فترة"""
+        return db.session.query(
+            cls.day.label('date'),
+            db.func.sum(cls.total_amount).label('total')
+        ).filter(
+            cls.day >= from_date,
+            cls.day <= to_date
+        ).group_by(cls.day).order_by(cls.day).all()
+
+    @classmethod
+    def rebuild(cls):
+        """إعادة بناء الجدول من المدفوعات"""
+        from app.models.payment import Payment
+
+        day = db.func.date(Payment.payment_date)
+        method = db.func.coalesce(Payment.payment_method, 'cash')
+        user_id = db.func.coalesce(Payment.user_id, 0)
+        source = db.select(
+            day,
+            method,
+            user_id,
+            db.func.count(Payment.id),
+            db.func.coalesce(db.func.sum(Payment.amount), 0)
+        ).group_by(day, method, user_id)
+
+        db.session.execute(db.delete(cls))
+        db.session.execute(db.insert(cls).from_select(
+            ['day', 'payment_method', 'user_id', 'payments_count', 'total_amount'],
+            source
+        ))
+        _bump_version()
+
+    def __repr__(self):
+        return f'<DailyCollectionRollup {self.day} {self.payment_method}>'
@@ -2,12 +2,18 @@
 نموذج القسط
 """
 from datetime import datetime, date
+from sqlalchemy.orm import contains_eager, joinedload
 from app import db
 
 
 class Installment(db.Model):
     """نموذج القسط"""
     __tablename__ = 'installments'
+    __table_args__ = (
+        db.Index('ix_installments_due_date_status', 'due_date', 'status'),
+        # ترتيب قوائم الـ API بالمؤشر (due_date, id)
+        db.Index('ix_installments_due_date_id', 'due_date', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     invoice_id = db.Column(db.Integer, db.ForeignKey(
@@ -23,7 +29,7 @@ class Installment(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(
-        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # العلاقات
     payments = db.relationship(
@@ -41,69 +47,117 @@ class Installment(db.Model):
         """هل القسط متأخر؟"""
         return self.days_overdue > 0
 
+    @property
+    def current_status(self):
+        """الحالة الفعلية (متأخر حتى قبل تشغيل مهمة تحديث التأخير)"""
+        if self.status in ['pending', 'partial'] and self.is_overdue:
+            return 'overdue'
+        return self.status
+
+    @classmethod
+    def overdue_filter(cls, today=None):
+        """شرط الأقساط المتأخرة داخل الاستعلام (لا يعتمد على عمود الحالة)"""
+        today = today or date.today()
+        return db.and_(
+            cls.due_date < today,
+            cls.status.in_(['pending', 'partial', 'overdue'])
+        )
+
+    @classmethod
+    def load_options(cls):
+        """تحميل الفاتورة والعميل مع الأقساط (ما يحتاجه to_dict والقوائم)"""
+        from app.models.invoice import Invoice
+        return (joinedload(cls.invoice).joinedload(Invoice.customer),)
+
+    @classmethod
+    def _with_invoice(cls):
+        """الأقساط مع الفاتورة (نفس الـ JOIN) والعميل"""
+        from app.models.invoice import Invoice
+        return cls.query.join(cls.invoice).options(
+            contains_eager(cls.invoice).joinedload(Invoice.customer))
+
+    @classmethod
+    def current_status_expr(cls, today=None):
+        """الحالة الفعلية في SQL (مثل current_status)"""
+        today = today or date.today()
+        return db.case(
+            (db.and_(cls.status.in_(['pending', 'partial']), cls.due_date < today), 'overdue'),
+            else_=cls.status
+        )
+
     @classmethod
     def get_today(cls):
         """جلب أقساط اليوم"""
         today = date.today()
-        return cls.query.join(cls.invoice).filter(
+        return cls._with_invoice().filter(
             cls.due_date == today,
             cls.status.in_(['pending', 'partial'])
         ).all()
 
     @classmethod
-    def get_overdue(cls):
+    def get_overdue(cls, limit=None):
         """جلب الأقساط المتأخرة"""
-        today = date.today()
-        return cls.query.join(cls.invoice).filter(
-            cls.due_date < today,
-            cls.status.in_(['pending', 'partial', 'overdue'])
-        ).order_by(cls.due_date).all()
+        return cls._with_invoice().filter(
+            cls.overdue_filter()
+        ).order_by(cls.due_date).limit(limit).all()
+
+    @classmethod
+    def due_amount_expr(cls):
+        """المبلغ المستحق في SQL: المتبقي أو قيمة القسط إذا لم يُسجل متبقٍ"""
+        return db.func.coalesce(
+            db.func.nullif(cls.remaining_amount, 0), cls.amount)
+
+    @classmethod
+    def paid_amount_expr(cls):
+        """المبلغ المسدد في SQL من المتبقي (كل طرق الدفع تحدث المتبقي)"""
+        return cls.amount - db.func.coalesce(cls.remaining_amount, cls.amount)
 
     @classmethod
-    def update_overdue_status(cls):
-        """تحديث حالة الأقساط المتأخرة"""
+    def update_overdue_status(cls, commit=True):
+        """تحديث حالة الأقساط المتأخرة (تُستدعى من مهمة مجدولة فقط)"""
         today = date.today()
-        cls.query.filter(
+        updated = cls.query.filter(
             cls.due_date < today,
             cls.status.in_(['pending', 'partial'])
         ).update({'status': 'overdue'}, synchronize_session=False)
-        db.session.commit()
+
+        if commit:
+            db.session.commit()
+
+        return updated
 
     @classmethod
     def get_stats(cls):
-        """إحصائيات الأقساط"""
+        """إحصائيات الأقساط (استعلام تجميعي واحد)"""
         today = date.today()
 
-        # الأقساط المتأخرة
-        overdue = cls.query.filter(
-            cls.due_date < today,
+        due_amount = cls.due_amount_expr()
+        is_overdue = cls.due_date < today
+        is_today = db.and_(cls.due_date == today,
+                           cls.status.in_(['pending', 'partial']))
+
+        row = db.session.query(
+            db.func.count(cls.id).filter(is_overdue).label('overdue_count'),
+            db.func.sum(due_amount).filter(is_overdue).label('overdue_amount'),
+            db.func.count(cls.id).filter(is_today).label('today_count'),
+            db.func.sum(due_amount).filter(is_today).label('today_amount'),
+        ).filter(
+            cls.due_date <= today,
             cls.status.in_(['pending', 'partial', 'overdue'])
-        ).all()
-
-        overdue_count = len(overdue)
-        overdue_amount = sum(float(i.remaining_amount or i.amount)
-                             for i in overdue)
-
-        # أقساط اليوم
-        today_installments = cls.query.filter(
-            cls.due_date == today,
-            cls.status.in_(['pending', 'partial'])
-        ).all()
-
-        today_count = len(today_installments)
-        today_amount = sum(float(i.remaining_amount or i.amount)
-                           for i in today_installments)
+        ).one()
 
         return {
-            'overdue_count': overdue_count,
-            'overdue_amount': overdue_amount,
-            'today_count': today_count,
-            'today_amount': today_amount,
+            'overdue_count': row.overdue_count or 0,
+            'overdue_amount': float(row.overdue_amount) if row.overdue_amount is not None else 0,
+            'today_count': row.today_count or 0,
+            'today_amount': float(row.today_amount) if row.today_amount is not None else 0,
         }
 
     def pay(self, amount, user_id=None, notes=None):
         """دفع جزء أو كل القسط"""
         from app.models.payment import Payment
+        from app.models.daily_rollup import DailyCollectionRollup
+        from app.services.live_stats import stats_publisher
 
         # إنشاء رقم إيصال
         receipt_number = f"RCP-{datetime.utcnow().strftime('%Y%m%d')}-{Installment.query.count():04d}"
@@ -119,6 +173,7 @@ class Installment(db.Model):
             notes=notes
         )
         db.session.add(payment)
+        DailyCollectionRollup.record_payment(payment)
 
         # تحديث القسط
         self.paid_amount = float(self.paid_amount or 0) + amount
@@ -135,6 +190,7 @@ class Installment(db.Model):
         self.invoice.update_amounts()
 
         db.session.commit()
+        stats_publisher.request_refresh()
 
         return payment
 
@@ -152,7 +208,7 @@ class Installment(db.Model):
             'remaining_amount': float(self.remaining_amount) if self.remaining_amount else 0,
             'due_date': self.due_date.isoformat() if self.due_date else None,
             'paid_date': self.paid_date.isoformat() if self.paid_date else None,
-            'status': self.status,
+            'status': self.current_status,
             'days_overdue': self.days_overdue,
             'notes': self.notes,
         }
@@ -2,12 +2,17 @@
 نموذج الفاتورة وبنود الفاتورة
 """
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 from app import db
 
 
 class Invoice(db.Model):
     """نموذج الفاتورة"""
     __tablename__ = 'invoices'
+    __table_args__ = (
+        db.Index('ix_invoices_created_at_status_type',
+                 'created_at', 'status', 'invoice_type'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     invoice_number = db.Column(
@@ -27,7 +32,7 @@ class Invoice(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(
-        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # العلاقات
     items = db.relationship('InvoiceItem', backref='invoice',
@@ -55,16 +60,50 @@ class Invoice(db.Model):
     @property
     def paid_installments_count(self):
         """عدد الأقساط المدفوعة"""
+        if '_installment_counts' in self.__dict__:
+            return self._installment_counts[0]
         return self.installments.filter_by(status='paid').count()
 
     @property
     def pending_installments_count(self):
         """عدد الأقساط المعلقة"""
+        if '_installment_counts' in self.__dict__:
+            return self._installment_counts[1]
         from app.models.installment import Installment
         return self.installments.filter(
             Installment.status.in_(['pending', 'partial', 'overdue'])
         ).count()
 
+    @classmethod
+    def get_installment_counts(cls, ids):
+        """عدد الأقساط (المدفوعة، المعلقة) لعدة فواتير في استعلام تجميعي واحد"""
+        from app.models.installment import Installment
+
+        rows = db.session.query(
+            Installment.invoice_id,
+            db.func.count(Installment.id).filter(Installment.status == 'paid'),
+            db.func.count(Installment.id).filter(
+                Installment.status.in_(['pending', 'partial', 'overdue']))
+        ).filter(
+            Installment.invoice_id.in_(ids)
+        ).group_by(Installment.invoice_id).all() if ids else []
+
+        counts = {invoice_id: (paid, pending) for invoice_id, paid, pending in rows}
+        return {id: counts.get(id, (0, 0)) for id in ids}
+
+    @classmethod
+    def preload_installment_counts(cls, invoices):
+        """عدد الأقساط المدفوعة والمعلقة لكل الفواتير في استعلام واحد"""
+        counts = cls.get_installment_counts([i.id for i in invoices])
+        for invoice in invoices:
+            invoice._installment_counts = counts[invoice.id]
+        return invoices
+
+    @classmethod
+    def load_options(cls):
+        """تحميل العميل والمستخدم مع الفواتير (ما يحتاجه to_dict والقوائم)"""
+        return (joinedload(cls.customer), joinedload(cls.user))
+
     def update_amounts(self):
         """تحديث المبالغ"""
         total_paid = sum(float(p.amount) for p in self.payments)
@@ -115,6 +154,12 @@ class Invoice(db.Model):
 class InvoiceItem(db.Model):
     """نموذج بند الفاتورة"""
     __tablename__ = 'invoice_items'
+    __table_args__ = (
+        # فهرس تغطية لتقرير الأرباح (لا يحتاج قراءة جدول المنتجات)
+        db.Index('ix_invoice_items_invoice_product', 'invoice_id', 'product_id',
+                 postgresql_include=['product_name', 'quantity',
+                                     'total_price', 'unit_cost']),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     invoice_id = db.Column(db.Integer, db.ForeignKey(
@@ -124,6 +169,8 @@ class InvoiceItem(db.Model):
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Numeric(10, 2), nullable=False)
     total_price = db.Column(db.Numeric(10, 2), nullable=False)
+    # تكلفة الوحدة وقت البيع (لا تتأثر بتغيير سعر التكلفة لاحقاً)
+    unit_cost = db.Column(db.Numeric(10, 2))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
@@ -136,6 +183,7 @@ class InvoiceItem(db.Model):
             'quantity': self.quantity,
             'unit_price': float(self.unit_price) if self.unit_price else 0,
             'total_price': float(self.total_price) if self.total_price else 0,
+            'unit_cost': float(self.unit_cost) if self.unit_cost else 0,
         }
 
     def __repr__(self):
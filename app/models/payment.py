@@ -2,12 +2,18 @@
 نموذج المدفوعات
 """
 from datetime import datetime, date
+from sqlalchemy.orm import joinedload
 from app import db
+from app.utils.helpers import date_range_filter
 
 
 class Payment(db.Model):
     """نموذج المدفوعة"""
     __tablename__ = 'payments'
+    __table_args__ = (
+        # ترتيب قوائم الـ API بالمؤشر (payment_date, id)
+        db.Index('ix_payments_payment_date_id', 'payment_date', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     invoice_id = db.Column(db.Integer, db.ForeignKey(
@@ -17,17 +23,24 @@ class Payment(db.Model):
     payment_method = db.Column(
         db.String(20), default='cash')  # cash, card, transfer
     receipt_number = db.Column(db.String(50), index=True)
-    payment_date = db.Column(db.DateTime, default=datetime.utcnow)
+    payment_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    @classmethod
+    def load_options(cls):
+        """تحميل الفاتورة والعميل والمستخدم مع المدفوعات (ما يحتاجه to_dict والقوائم)"""
+        from app.models.invoice import Invoice
+        return (joinedload(cls.invoice).joinedload(Invoice.customer),
+                joinedload(cls.user))
+
     @classmethod
     def get_today(cls):
         """جلب مدفوعات اليوم"""
         today = date.today()
-        return cls.query.filter(
-            db.func.date(cls.payment_date) == today
+        return cls.query.options(*cls.load_options()).filter(
+            date_range_filter(cls.payment_date, today, today)
         ).order_by(cls.payment_date.desc()).all()
 
     @classmethod
@@ -37,16 +50,15 @@ class Payment(db.Model):
         result = db.session.query(
             db.func.coalesce(db.func.sum(cls.amount), 0)
         ).filter(
-            db.func.date(cls.payment_date) == today
+            date_range_filter(cls.payment_date, today, today)
         ).scalar()
         return float(result) if result else 0
 
     @classmethod
     def get_by_date_range(cls, from_date, to_date):
         """جلب مدفوعات فترة معينة"""
-        return cls.query.filter(
-            db.func.date(cls.payment_date) >= from_date,
-            db.func.date(cls.payment_date) <= to_date
+        return cls.query.options(*cls.load_options()).filter(
+            date_range_filter(cls.payment_date, from_date, to_date)
         ).order_by(cls.payment_date.desc()).all()
 
     @classmethod
@@ -55,8 +67,7 @@ class Payment(db.Model):
         result = db.session.query(
             db.func.coalesce(db.func.sum(cls.amount), 0)
         ).filter(
-            db.func.date(cls.payment_date) >= from_date,
-            db.func.date(cls.payment_date) <= to_date
+            date_range_filter(cls.payment_date, from_date, to_date)
         ).scalar()
         return float(result) if result else 0
 
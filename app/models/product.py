@@ -2,19 +2,27 @@
 نموذج المنتج
 """
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 from app import db
+from app.models.category import Category
 
 
 class Product(db.Model):
     """نموذج المنتج"""
     __tablename__ = 'products'
+    __table_args__ = (
+        # فهرس جزئي صغير لا يحتوي إلا المنتجات النشطة منخفضة المخزون
+        db.Index('ix_products_low_stock', 'name',
+                 postgresql_where=db.text('is_active AND quantity <= min_quantity'),
+                 sqlite_where=db.text('is_active = 1 AND quantity <= min_quantity')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'))
     barcode = db.Column(db.String(50), index=True)
-    sku = db.Column(db.String(50))
+    sku = db.Column(db.String(50), index=True)
     cash_price = db.Column(db.Numeric(10, 2), nullable=False)
     installment_price = db.Column(db.Numeric(10, 2))
     cost_price = db.Column(db.Numeric(10, 2))
@@ -27,7 +35,7 @@ class Product(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(
-        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # العلاقات
     invoice_items = db.relationship(
@@ -48,15 +56,53 @@ class Product(db.Model):
     @classmethod
     def get_active(cls):
         """جلب المنتجات النشطة"""
-        return cls.query.filter_by(is_active=True).order_by(cls.name).all()
+        return cls.query.options(*cls.load_options()).filter_by(
+            is_active=True).order_by(cls.name).all()
 
     @classmethod
-    def get_low_stock(cls):
+    def load_options(cls):
+        """تحميل التصنيف مع المنتجات (ما يحتاجه to_dict والقوائم)"""
+        return (joinedload(cls.category),)
+
+    @classmethod
+    def low_stock_filter(cls):
+        """شرط المخزون المنخفض (يطابق الفهرس الجزئي ix_products_low_stock)"""
+        return db.and_(cls.is_active == True, cls.quantity <= cls.min_quantity)
+
+    @classmethod
+    def get_low_stock(cls, limit=None):
         """جلب المنتجات منخفضة المخزون"""
-        return cls.query.filter(
-            cls.quantity <= cls.min_quantity,
+        query = cls.query.filter(cls.low_stock_filter()).order_by(cls.name)
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+
+    @classmethod
+    def count_low_stock(cls):
+        """عدد المنتجات منخفضة المخزون"""
+        return db.session.query(db.func.count(cls.id)).filter(
+            cls.low_stock_filter()).scalar()
+
+    @classmethod
+    def get_inventory_by_category(cls):
+        """قيمة المخزون وعدد المنتجات المنخفضة لكل تصنيف (استعلام تجميعي واحد)"""
+        value = db.func.coalesce(cls.cost_price, 0) * db.func.coalesce(cls.quantity, 0)
+
+        return db.session.query(
+            cls.category_id,
+            Category.name.label('category_name'),
+            db.func.count(cls.id).label('products_count'),
+            db.func.coalesce(db.func.sum(cls.quantity), 0).label('total_quantity'),
+            db.func.coalesce(db.func.sum(value), 0).label('total_value'),
+            db.func.count(cls.id).filter(
+                cls.quantity <= cls.min_quantity).label('low_stock_count'),
+        ).outerjoin(
+            Category, cls.category_id == Category.id
+        ).filter(
             cls.is_active == True
-        ).all()
+        ).group_by(
+            cls.category_id, Category.name
+        ).order_by(db.desc('total_value')).all()
 
     @classmethod
     def search(cls, query, limit=20):
@@ -0,0 +1,120 @@
+"""
+نموذج مهام التقارير في الخلفية
+"""
+from datetime import datetime, timedelta
+import hashlib
+import json
+import os
+from app import db
+
+
+class ReportJob(db.Model):
+    """مهمة تجهيز تقرير تنفذها عملية العامل (flask report-worker)"""
+    __tablename__ = 'report_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    report = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    export_format = db.Column(db.String(10), nullable=False, default='csv')
+    # بصمة (التقرير + المعاملات + الصيغة) لإعادة استخدام النتائج
+    params_hash = db.Column(db.String(64), nullable=False, index=True)
+    # بصمة نسخة البيانات وقت التسجيل (لا تُعاد النتيجة بعد تغير البيانات)
+    data_version = db.Column(db.String(64))
+    # queued, running, done, failed
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    progress = db.Column(db.Integer, default=0)
+    total_rows = db.Column(db.Integer)
+    rows_written = db.Column(db.Integer, default=0)
+    result_path = db.Column(db.String(500))
+    error = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    @staticmethod
+    def make_hash(report, params, export_format):
+        """بصمة ثابتة لمعاملات التقرير"""
+        payload = json.dumps([report, params, export_format], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def find_reusable(cls, params_hash, ttl, user_id=None, data_version=None):
+        """مهمة قائمة بنفس المعاملات ونسخة البيانات لنفس المستخدم (قيد التنفيذ أو نتيجة حديثة)"""
+        fresh_after = datetime.utcnow() - timedelta(seconds=ttl)
+        return cls.query.filter(
+            cls.params_hash == params_hash,
+            cls.data_version == data_version,
+            # المستخدم لا يرى إلا مهامه، فلا يُعاد استخدام مهمة مستخدم آخر
+            cls.created_by == user_id,
+            db.or_(
+                cls.status.in_(['queued', 'running']),
+                db.and_(cls.status == 'done', cls.finished_at >= fresh_after)
+            )
+        ).order_by(cls.id.desc()).first()
+
+    @classmethod
+    def claim_next(cls):
+        """حجز أقدم مهمة منتظرة (تحديث ذري يمنع تنفيذها مرتين)"""
+        candidates = db.session.query(cls.id).filter_by(
+            status='queued').order_by(cls.id).limit(5).all()
+
+        for (job_id,) in candidates:
+            claimed = cls.query.filter_by(id=job_id, status='queued').update({
+                'status': 'running',
+                'started_at': datetime.utcnow(),
+                'progress': 0,
+            }, synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                return db.session.get(cls, job_id)
+
+        return None
+
+    @property
+    def is_finished(self):
+        """هل انتهت المهمة (بنجاح أو فشل)؟"""
+        return self.status in ('done', 'failed')
+
+    @property
+    def has_result(self):
+        """هل ملف النتيجة جاهز للتنزيل؟"""
+        return self.status == 'done' and bool(self.result_path) and \
+            os.path.exists(self.result_path)
+
+    @property
+    def download_name(self):
+        """اسم ملف التنزيل"""
+        day = (self.finished_at or self.created_at or datetime.utcnow()).date()
+        return f'{self.report}_{day.isoformat()}.{self.export_format}'
+
+    def get_status_label(self):
+        """الحالة بالعربي"""
+        labels = {
+            'queued': 'في الانتظار',
+            'running': 'قيد التجهيز',
+            'done': 'جاهز',
+            'failed': 'فشل',
+        }
+        return labels.get(self.status, self.status)
+
+    def to_dict(self):
+        """تحويل لـ Dictionary"""
+        return {
+            'id': self.id,
+            'report': self.report,
+            'params': self.params,
+            'format': self.export_format,
+            'status': self.status,
+            'status_label': self.get_status_label(),
+            'progress': self.progress,
+            'total_rows': self.total_rows,
+            'rows_written': self.rows_written,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f'<ReportJob {self.id} {self.report} {self.status}>'
@@ -0,0 +1,3 @@
+"""
+خدمات التطبيق (استعلامات مشتركة بين المتحكمات)
+"""
@@ -0,0 +1,105 @@
+"""
+أعمار الذمم المدينة (0-30 / 31-60 / 61-90 / +90 يوم)
+
+التوزيع على الشرائح يتم في قاعدة البيانات بتجميع CASE واحد على الأقساط
+المتأخرة، والنتيجة تُخزن في ذاكرة التقارير حتى تتغير البيانات أو اليوم.
+"""
+from datetime import date, timedelta
+from app import db
+from app.models.installment import Installment
+from app.models.invoice import Invoice
+from app.models.customer import Customer
+from app.services.report_cache import cached
+from app.utils.pagination import SqlPagination
+
+# (المفتاح، العنوان، أقل عدد أيام تأخير)
+AGING_BUCKETS = (
+    ('days_0_30', '0 - 30 يوم', 0),
+    ('days_31_60', '31 - 60 يوم', 31),
+    ('days_61_90', '61 - 90 يوم', 61),
+    ('days_90_plus', 'أكثر من 90 يوم', 91),
+)
+
+
+def _bucket_columns(today):
+    """أعمدة مجموع كل شريحة (CASE على تاريخ الاستحقاق بدون حساب أيام لكل صف)"""
+    due_amount = Installment.due_amount_expr()
+    columns = []
+
+    for i, (key, _, min_days) in enumerate(AGING_BUCKETS):
+        # الشريحة: تاريخ الاستحقاق بين حدين (min_days <= التأخير < الشريحة التالية)
+        conditions = [Installment.due_date <= today - timedelta(days=min_days)]
+        if i + 1 < len(AGING_BUCKETS):
+            next_min = AGING_BUCKETS[i + 1][2]
+            conditions.append(
+                Installment.due_date > today - timedelta(days=next_min))
+
+        columns.append(db.func.coalesce(db.func.sum(
+            db.case((db.and_(*conditions), due_amount), else_=0)
+        ), 0).label(key))
+
+    columns.append(db.func.coalesce(db.func.sum(due_amount), 0).label('total'))
+    return columns
+
+
+def _row_buckets(row):
+    """تحويل صف التجميع إلى dict"""
+    data = {key: float(getattr(row, key)) for key, _, _ in AGING_BUCKETS}
+    data['total'] = float(row.total)
+    return data
+
+
+def _aging_query(today, *columns):
+    """الأقساط المتأخرة حتى اليوم مع الفواتير"""
+    return db.session.query(*columns).select_from(Installment).join(
+        Invoice, Installment.invoice_id == Invoice.id
+    ).filter(
+        Installment.overdue_filter(today)
+    )
+
+
+def get_aging_totals():
+    """إجمالي كل شريحة وعدد العملاء"""
+    def build():
+        today = date.today()
+        row = _aging_query(
+            today,
+            db.func.count(db.distinct(Invoice.customer_id)).label('customers_count'),
+            *_bucket_columns(today)
+        ).one()
+
+        data = _row_buckets(row)
+        data['customers_count'] = row.customers_count
+        data['as_of'] = today.isoformat()
+        return data
+
+    return cached('aging', 'totals', build)
+
+
+def get_aging_by_customer(page=1, per_page=20):
+    """الشرائح لكل عميل (الأعلى مديونية أولاً)"""
+    def build():
+        today = date.today()
+        query = _aging_query(
+            today,
+            Invoice.customer_id,
+            Customer.full_name,
+            Customer.phone,
+            *_bucket_columns(today)
+        ).join(
+            Customer, Invoice.customer_id == Customer.id
+        ).group_by(
+            Invoice.customer_id, Customer.full_name, Customer.phone
+        ).order_by(db.desc('total'), Invoice.customer_id)
+
+        total = get_aging_totals()['customers_count']
+        pagination = SqlPagination(query, page, per_page, total=total)
+        pagination.items = [dict(
+            customer_id=r.customer_id,
+            customer_name=r.full_name,
+            phone=r.phone,
+            **_row_buckets(r)
+        ) for r in pagination.items]
+        return pagination
+
+    return cached('aging', ('customers', page, per_page), build)
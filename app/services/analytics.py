@@ -0,0 +1,436 @@
+"""
+مكعب تحليلي في الذاكرة للجداول المحورية (Pivot)
+
+جداول الحقائق (بنود الفواتير والمدفوعات) تُحمل في أعمدة مضغوطة
+(array) والنصوص مرمزة بقاموس، ثم تُحدث تدريجياً بآخر id كل
+ANALYTICS_REFRESH_SECONDS. الاستعلام المحوري يمر على الأعمدة في الذاكرة
+بدون الرجوع لقاعدة البيانات: تجميع أولي بالقيم الخام (أرقام) ثم تحويل
+المجموعات القليلة الناتجة إلى أسماء (التصنيف، المدينة، الموظف).
+المكعب لكل عملية، فكل عامل Gunicorn يحتفظ بنسخته.
+"""
+import threading
+import time
+from array import array
+from datetime import date, datetime
+from itertools import islice
+from app import db
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.payment import Payment
+from app.models.product import Product
+from app.models.category import Category
+from app.models.customer import Customer
+from app.models.user import User
+from app.utils.export import YIELD_PER
+
+# الصفوف الأخيرة تُقرأ مرة أخرى عند التحديث لالتقاط المعاملات التي
+# حصلت على id أصغر لكنها اكتملت بعد التحديث السابق
+ID_OVERLAP = 1000
+
+# أعمدة كل جدول حقائق: (الاسم، نوع array)
+SALES_COLUMNS = (
+    ('id', 'q'), ('invoice_id', 'q'), ('day', 'l'), ('month', 'l'),
+    ('product_id', 'q'), ('product', 'l'), ('customer_id', 'q'), ('user_id', 'q'),
+    ('invoice_type', 'l'), ('quantity', 'd'), ('revenue', 'd'), ('cost', 'd'),
+)
+COLLECTIONS_COLUMNS = (
+    ('id', 'q'), ('day', 'l'), ('month', 'l'), ('customer_id', 'q'),
+    ('user_id', 'q'), ('payment_method', 'l'), ('amount', 'd'),
+)
+
+# البعد ← العمود الذي يُجمع عليه
+FACT_DIMENSIONS = {
+    'sales': {
+        'category': 'product_id',
+        'product': 'product',
+        'invoice_type': 'invoice_type',
+        'city': 'customer_id',
+        'user': 'user_id',
+        'month': 'month',
+        'day': 'day',
+    },
+    'collections': {
+        'city': 'customer_id',
+        'user': 'user_id',
+        'payment_method': 'payment_method',
+        'month': 'month',
+        'day': 'day',
+    },
+}
+
+# المقاييس المجمعة من الأعمدة (count = عدد الصفوف، profit = revenue - cost)
+FACT_MEASURES = {
+    'sales': ('count', 'quantity', 'revenue', 'cost', 'profit'),
+    'collections': ('count', 'amount'),
+}
+
+DIMENSION_LABELS = {
+    'category': 'التصنيف',
+    'product': 'المنتج',
+    'invoice_type': 'نوع الفاتورة',
+    'city': 'المدينة',
+    'user': 'الموظف',
+    'payment_method': 'طريقة الدفع',
+    'month': 'الشهر',
+    'day': 'اليوم',
+}
+
+MEASURE_LABELS = {
+    'count': 'العدد',
+    'quantity': 'الكمية',
+    'revenue': 'الإيرادات',
+    'cost': 'التكلفة',
+    'profit': 'الربح',
+    'amount': 'المبلغ',
+}
+
+# أقصى عدد أبعاد في الجدول المحوري
+MAX_DIMENSIONS = 3
+
+
+def _month_key(day):
+    """رقم الشهر (سنة × 12 + شهر)"""
+    return day.year * 12 + day.month - 1
+
+
+def _month_label(key):
+    year, month = divmod(key, 12)
+    return f'{year}-{month + 1:02d}'
+
+
+class Dictionary:
+    """ترميز القيم النصية المتكررة بأرقام"""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def encode(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class FactTable:
+    """جدول حقائق عمودي: كل عمود array بنفس الطول"""
+
+    def __init__(self, columns):
+        self.names = [name for name, _ in columns]
+        self.columns = {name: array(typecode) for name, typecode in columns}
+        self.active = bytearray()
+        self.dictionaries = {}
+        self.size = 0
+        self.last_id = 0
+
+    def dictionary(self, column):
+        return self.dictionaries.setdefault(column, Dictionary())
+
+    def append(self, values, active=True):
+        """إضافة صف (القيم بنفس ترتيب الأعمدة)"""
+        for name, value in zip(self.names, values):
+            self.columns[name].append(value)
+        self.active.append(1 if active else 0)
+        self.size += 1
+        self.last_id = max(self.last_id, values[0])
+
+    def ids_after(self, since):
+        """أرقام الصفوف المحملة الأكبر من since (من نهاية الجدول)"""
+        ids = self.columns['id']
+        seen = set()
+        i = self.size - 1
+        while i >= 0 and ids[i] > since:
+            seen.add(ids[i])
+            i -= 1
+        return seen
+
+    def nbytes(self):
+        return sum(col.itemsize * len(col) for col in self.columns.values()) + len(self.active)
+
+
+class AnalyticsCube:
+    """جداول الحقائق وأسماء الأبعاد في الذاكرة"""
+
+    def __init__(self, refresh_interval=60):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    def init_app(self, app):
+        self.refresh_interval = app.config.get(
+            'ANALYTICS_REFRESH_SECONDS', self.refresh_interval)
+
+    def _reset(self):
+        self.facts = {
+            'sales': FactTable(SALES_COLUMNS),
+            'collections': FactTable(COLLECTIONS_COLUMNS),
+        }
+        self.products = {}     # id → category_id
+        self.categories = {}   # id → الاسم
+        self.cities = {}       # id العميل → المدينة
+        self.users = {}        # id → الاسم
+        self._marks = {}
+        self.refreshed_at = None
+        self._refreshed_clock = None
+
+    # ---------- التحميل ----------
+
+    def ensure_fresh(self, force=False):
+        """تحديث المكعب إذا مر وقت التحديث (أو عند الطلب)"""
+        if not force and self._is_fresh():
+            return
+        with self._lock:
+            if not force and self._is_fresh():
+                return
+            self.refresh()
+
+    def _is_fresh(self):
+        return self._refreshed_clock is not None and \
+            time.monotonic() - self._refreshed_clock < self.refresh_interval
+
+    def refresh(self):
+        """تحميل الصفوف الجديدة فقط (يُستدعى مع القفل)"""
+        started = datetime.utcnow()
+        invoices_mark = db.session.query(db.func.max(Invoice.updated_at)).scalar()
+
+        self._load_labels()
+        self._load_sales()
+        self._load_collections()
+        self._apply_cancellations(self._marks.get('invoice_status'))
+
+        self._marks['invoice_status'] = invoices_mark
+        self.refreshed_at = started
+        self._refreshed_clock = time.monotonic()
+
+    def _changed(self, model, *columns):
+        """الصفوف المعدلة منذ آخر تحديث (مع تحديث العلامة)"""
+        mark = self._marks.get(model.__tablename__)
+        query = db.session.query(model.id, model.updated_at, *columns)
+        if mark is not None:
+            query = query.filter(model.updated_at >= mark)
+
+        rows = query.all()
+        marks = [r.updated_at for r in rows if r.updated_at is not None]
+        if marks:
+            self._marks[model.__tablename__] = max(marks)
+        return rows
+
+    def _load_labels(self):
+        for r in self._changed(Category, Category.name):
+            self.categories[r.id] = r.name
+        for r in self._changed(Product, Product.category_id):
+            self.products[r.id] = r.category_id
+        for r in self._changed(Customer, Customer.city):
+            self.cities[r.id] = r.city
+        for r in self._changed(User, User.full_name):
+            self.users[r.id] = r.full_name
+
+    def _load_sales(self):
+        fact = self.facts['sales']
+        since = max(fact.last_id - ID_OVERLAP, 0)
+        seen = fact.ids_after(since)
+        products = fact.dictionary('product')
+        types = fact.dictionary('invoice_type')
+
+        query = db.session.query(
+            InvoiceItem.id, InvoiceItem.invoice_id, InvoiceItem.product_id,
+            InvoiceItem.product_name, InvoiceItem.quantity, InvoiceItem.total_price,
+            InvoiceItem.unit_cost, Invoice.created_at, Invoice.customer_id,
+            Invoice.user_id, Invoice.invoice_type, Invoice.status
+        ).join(
+            Invoice, InvoiceItem.invoice_id == Invoice.id
+        ).filter(
+            InvoiceItem.id > since
+        ).order_by(InvoiceItem.id).yield_per(YIELD_PER)
+
+        for r in query:
+            if r.id in seen:
+                continue
+            day = r.created_at.date()
+            fact.append((
+                r.id, r.invoice_id, day.toordinal(), _month_key(day),
+                r.product_id or 0, products.encode(r.product_name),
+                r.customer_id or 0, r.user_id or 0, types.encode(r.invoice_type),
+                float(r.quantity), float(r.total_price),
+                float(r.unit_cost or 0) * r.quantity,
+            ), active=r.status != 'cancelled')
+
+    def _load_collections(self):
+        fact = self.facts['collections']
+        since = max(fact.last_id - ID_OVERLAP, 0)
+        seen = fact.ids_after(since)
+        methods = fact.dictionary('payment_method')
+
+        query = db.session.query(
+            Payment.id, Payment.payment_date, Payment.user_id,
+            Payment.payment_method, Payment.amount, Invoice.customer_id
+        ).join(
+            Invoice, Payment.invoice_id == Invoice.id
+        ).filter(
+            Payment.id > since
+        ).order_by(Payment.id).yield_per(YIELD_PER)
+
+        for r in query:
+            if r.id in seen:
+                continue
+            day = r.payment_date.date()
+            fact.append((
+                r.id, day.toordinal(), _month_key(day), r.customer_id or 0,
+                r.user_id or 0, methods.encode(r.payment_method), float(r.amount),
+            ))
+
+    def _apply_cancellations(self, mark):
+        """إيقاف صفوف الفواتير التي أُلغيت منذ آخر تحديث"""
+        if mark is None:
+            return
+        cancelled = {r[0] for r in db.session.query(Invoice.id).filter(
+            Invoice.status == 'cancelled',
+            Invoice.updated_at >= mark
+        )}
+        if not cancelled:
+            return
+
+        fact = self.facts['sales']
+        active = fact.active
+        for i, invoice_id in enumerate(islice(fact.columns['invoice_id'], fact.size)):
+            if invoice_id in cancelled:
+                active[i] = 0
+
+    # ---------- الاستعلام ----------
+
+    def _resolver(self, fact_name, dimension):
+        """دالة تحول القيمة الخام للعمود إلى قيمة البعد"""
+        fact = self.facts[fact_name]
+        if dimension == 'category':
+            return lambda pid: self.categories.get(self.products.get(pid)) or 'بدون تصنيف'
+        if dimension == 'city':
+            return lambda cid: self.cities.get(cid) or 'غير محدد'
+        if dimension == 'user':
+            return lambda uid: self.users.get(uid) or 'بدون مستخدم'
+        if dimension == 'month':
+            return _month_label
+        if dimension == 'day':
+            return lambda ordinal: date.fromordinal(ordinal).isoformat()
+
+        values = fact.dictionary(FACT_DIMENSIONS[fact_name][dimension]).values
+        return lambda code: values[code] or ''
+
+    def pivot(self, fact_name, dimensions, measures=None, from_date=None,
+              to_date=None, filters=None):
+        """
+        تجميع جدول الحقائق حسب الأبعاد.
+        filters: {البعد: مجموعة القيم المسموحة}
+        """
+        if fact_name not in FACT_DIMENSIONS:
+            raise ValueError('جدول غير معروف')
+        available = FACT_DIMENSIONS[fact_name]
+        measures = list(measures or FACT_MEASURES[fact_name])
+        filters = {k: set(v) for k, v in (filters or {}).items() if v}
+
+        if not dimensions or len(dimensions) > MAX_DIMENSIONS:
+            raise ValueError(f'اختر من 1 إلى {MAX_DIMENSIONS} أبعاد')
+        for name in list(dimensions) + list(filters):
+            if name not in available:
+                raise ValueError(f'بعد غير متاح: {name}')
+        for name in measures:
+            if name not in FACT_MEASURES[fact_name]:
+                raise ValueError(f'مقياس غير متاح: {name}')
+
+        self.ensure_fresh()
+
+        fact = self.facts[fact_name]
+        size = fact.size
+        keys = list(dimensions) + [f for f in filters if f not in dimensions]
+        base = [m for m in FACT_MEASURES[fact_name] if m in fact.columns]
+
+        lo = from_date.toordinal() if from_date else 0
+        hi = to_date.toordinal() if to_date else date.max.toordinal()
+        k = len(keys)
+
+        # المرحلة 1: تجميع بالقيم الخام
+        columns = [islice(fact.active, size), islice(fact.columns['day'], size)]
+        columns += [islice(fact.columns[available[d]], size) for d in keys]
+        columns += [islice(fact.columns[m], size) for m in base]
+
+        groups = {}
+        for row in zip(*columns):
+            if not row[0] or not lo <= row[1] <= hi:
+                continue
+            key = row[2:2 + k]
+            acc = groups.get(key)
+            if acc is None:
+                acc = groups[key] = [0] + [0.0] * len(base)
+            acc[0] += 1
+            for j, value in enumerate(row[2 + k:], 1):
+                acc[j] += value
+
+        # المرحلة 2: تحويل المجموعات إلى أسماء ودمج المتطابق
+        resolvers = [self._resolver(fact_name, d) for d in keys]
+        merged = {}
+        for raw, acc in groups.items():
+            values = [resolve(v) for resolve, v in zip(resolvers, raw)]
+            if any(values[keys.index(f)] not in allowed for f, allowed in filters.items()):
+                continue
+            out = merged.setdefault(tuple(values[:len(dimensions)]), [0] * len(acc))
+            for j, value in enumerate(acc):
+                out[j] += value
+
+        records = []
+        for key in sorted(merged):
+            acc = merged[key]
+            totals = dict(zip(['count'] + base, acc))
+            if 'profit' in measures:
+                totals['profit'] = totals['revenue'] - totals['cost']
+            record = dict(zip(dimensions, key))
+            record.update({m: totals[m] if m == 'count' else round(totals[m], 2)
+                           for m in measures})
+            records.append(record)
+
+        return {
+            'fact': fact_name,
+            'dimensions': list(dimensions),
+            'measures': measures,
+            'records': records,
+            'rows_scanned': size,
+            'as_of': self.refreshed_at.isoformat() if self.refreshed_at else None,
+        }
+
+    def stats(self):
+        """حجم المكعب للمراقبة"""
+        return {
+            'facts': {name: {'rows': fact.size, 'bytes': fact.nbytes(), 'last_id': fact.last_id}
+                      for name, fact in self.facts.items()},
+            'refreshed_at': self.refreshed_at.isoformat() if self.refreshed_at else None,
+            'refresh_interval': self.refresh_interval,
+        }
+
+
+analytics_cube = AnalyticsCube()
+
+
+def crosstab(result, column, measure):
+    """
+    تحويل نتيجة pivot إلى جدول متقاطع: البعد column يصبح أعمدة.
+    الناتج: (قيم الأعمدة، [(قيم الصف، {عمود: قيمة}، الإجمالي)])
+    """
+    row_dims = [d for d in result['dimensions'] if d != column]
+    column_values = sorted({r[column] for r in result['records']})
+    rows = {}
+    for r in result['records']:
+        key = tuple(r[d] for d in row_dims)
+        cells = rows.setdefault(key, {})
+        cells[r[column]] = cells.get(r[column], 0) + r[measure]
+    return column_values, [
+        (key, cells, sum(cells.values())) for key, cells in sorted(rows.items())
+    ]
+
+
+def pivot_filters(fact_name, args):
+    """فلاتر الأبعاد من معاملات الطلب (مثل ?city=القاهرة,الجيزة)"""
+    filters = {}
+    for dimension in FACT_DIMENSIONS.get(fact_name, {}):
+        values = [v.strip() for raw in args.getlist(dimension)
+                  for v in raw.split(',') if v.strip()]
+        if values:
+            filters[dimension] = values
+    return filters
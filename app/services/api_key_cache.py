@@ -0,0 +1,161 @@
+"""
+ذاكرة مفاتيح API الصالحة (لكل عملية)
+
+التحقق من المفتاح يُقرأ من الذاكرة لمدة API_KEY_CACHE_SECONDS بدلاً من
+استعلام لكل طلب، ويُحذف المفتاح منها فوراً عند تعطيله أو حذفه.
+آخر استخدام لا يُكتب مع كل طلب: يُجمع في الذاكرة ويُكتب لكل المفاتيح
+بأمر UPDATE واحد كل API_KEY_TOUCH_SECONDS (وعند إيقاف العملية).
+"""
+import atexit
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from app import db
+
+# بيانات المفتاح المتاحة للطلب (request.api_key)
+CachedApiKey = namedtuple('CachedApiKey', 'id name expires_at')
+
+
+class ApiKeyCache:
+    """المفاتيح الصالحة مع مدة صلاحية قصيرة، وتجميع كتابات آخر استخدام"""
+
+    def __init__(self, ttl=60, touch_interval=60):
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self._app = None
+        self._lock = threading.Lock()
+        self._entries = {}      # المفتاح → (CachedApiKey، وقت التحميل)
+        self._last_used = {}    # id → آخر استخدام لم يُكتب بعد
+        self._flushed_clock = time.monotonic()
+        self._stats = {'hits': 0, 'misses': 0, 'flushes': 0}
+
+    def init_app(self, app):
+        """ربط الذاكرة بالتطبيق وكتابة آخر استخدام عند إيقاف العملية"""
+        self.ttl = app.config.get('API_KEY_CACHE_SECONDS', self.ttl)
+        self.touch_interval = app.config.get('API_KEY_TOUCH_SECONDS', self.touch_interval)
+
+        if self._app is None:
+            atexit.register(self._flush_at_exit)
+        self._app = app
+
+    def validate(self, key):
+        """بيانات المفتاح إن كان صالحاً وغير منتهي، وإلا None"""
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._stats['hits'] += 1
+                data = entry[0]
+            else:
+                self._stats['misses'] += 1
+                data = None
+
+        if data is None:
+            data = self._load(key)
+            if data is None:
+                return None
+            with self._lock:
+                self._entries[key] = (data, now)
+
+        if data.expires_at and data.expires_at < datetime.utcnow():
+            self.invalidate(key)
+            return None
+
+        self.touch(data.id)
+        return data
+
+    def _load(self, key):
+        """قراءة المفتاح النشط من قاعدة البيانات"""
+        from app.models.api_key import ApiKey
+
+        row = db.session.query(
+            ApiKey.id, ApiKey.name, ApiKey.expires_at
+        ).filter_by(api_key=key, is_active=True).first()
+        return CachedApiKey(*row) if row else None
+
+    def invalidate(self, key, key_id=None):
+        """حذف المفتاح من الذاكرة (بعد تعطيله أو حذفه)"""
+        with self._lock:
+            self._entries.pop(key, None)
+            if key_id is not None:
+                self._last_used.pop(key_id, None)
+
+    def clear(self):
+        """تفريغ الذاكرة"""
+        with self._lock:
+            self._entries.clear()
+
+    def touch(self, key_id):
+        """تسجيل الاستخدام في الذاكرة، والكتابة إذا مرت الفترة"""
+        with self._lock:
+            self._last_used[key_id] = datetime.utcnow()
+            due = time.monotonic() - self._flushed_clock >= self.touch_interval
+
+        if due:
+            try:
+                self.flush()
+            except Exception:
+                # فشل كتابة آخر استخدام لا يمنع الطلب
+                if self._app is not None:
+                    self._app.logger.exception('فشل تحديث آخر استخدام لمفاتيح API')
+
+    def flush(self):
+        """كتابة آخر استخدام لكل المفاتيح بأمر UPDATE واحد"""
+        from app.models.api_key import ApiKey
+
+        with self._lock:
+            pending, self._last_used = self._last_used, {}
+            self._flushed_clock = time.monotonic()
+
+        if not pending:
+            return 0
+
+        table = ApiKey.__table__
+        statement = table.update().where(
+            table.c.id == db.bindparam('key_id'),
+            db.or_(
+                table.c.last_used_at.is_(None),
+                table.c.last_used_at < db.bindparam('used_at')
+            )
+        ).values(last_used_at=db.bindparam('used_at'))
+
+        # اتصال مستقل حتى لا يُنفذ commit على جلسة الطلب
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(statement, [
+                    {'key_id': key_id, 'used_at': used_at}
+                    for key_id, used_at in pending.items()
+                ])
+        except Exception:
+            # إرجاع القيم لتُكتب في المرة التالية
+            with self._lock:
+                for key_id, used_at in pending.items():
+                    self._last_used.setdefault(key_id, used_at)
+            raise
+
+        with self._lock:
+            self._stats['flushes'] += 1
+        return len(pending)
+
+    def _flush_at_exit(self):
+        try:
+            with self._app.app_context():
+                self.flush()
+        except Exception:
+            pass
+
+    def stats(self):
+        """إحصائيات للمراقبة"""
+        with self._lock:
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                pending_touches=len(self._last_used),
+                ttl=self.ttl,
+                touch_interval=self.touch_interval,
+            )
+
+
+api_key_cache = ApiKeyCache()
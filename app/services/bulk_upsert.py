@@ -0,0 +1,245 @@
+"""
+الإضافة والتحديث الجماعي (upsert) للمنتجات والعملاء من الأنظمة الخارجية
+
+الصفوف تُعالج على دفعات: لكل دفعة استعلام واحد لكل مفتاح مطابقة لمعرفة
+الموجود، ثم INSERT جماعي للجديد و UPDATE جماعي (بالـ id) للموجود، و commit
+واحد. لا توجد قيود unique على مفاتيح المطابقة (الباركود / الهاتف ...)،
+لذلك المطابقة تتم بالاستعلام وليس ON CONFLICT.
+"""
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from app import db
+from app.models.customer import Customer
+from app.models.product import Product
+
+# عدد الصفوف في كل دفعة (commit لكل دفعة)
+BULK_CHUNK_SIZE = 1000
+
+# أقصى عدد صفوف في الطلب الواحد
+BULK_MAX_ROWS = 20000
+
+
+class BulkUpsert:
+    """
+    fields: {اسم الحقل في الـ API: اسم العمود}
+    keys: أعمدة المطابقة بالترتيب (أول مفتاح يطابق سجلاً قائماً يُحدث)
+    required: الحقول المطلوبة عند الإضافة
+    """
+
+    def __init__(self, model, fields, keys, required):
+        self.model = model
+        self.fields = fields
+        self.keys = keys
+        self.required = required
+        self.columns = {name: model.__table__.c[column] for name, column in fields.items()}
+
+    def run(self, rows):
+        """تنفيذ الإضافة/التحديث وإرجاع نتيجة لكل صف بنفس الترتيب"""
+        results = [None] * len(rows)
+        seen_keys = {}
+        seen_ids = set()
+
+        for start in range(0, len(rows), BULK_CHUNK_SIZE):
+            chunk = list(enumerate(rows[start:start + BULK_CHUNK_SIZE], start))
+            self._run_chunk(chunk, results, seen_keys, seen_ids)
+
+        return results
+
+    def _run_chunk(self, chunk, results, seen_keys, seen_ids):
+        parsed = []
+        for index, row in chunk:
+            try:
+                parsed.append((index, self._parse(row)))
+            except ValueError as e:
+                results[index] = _error(index, str(e))
+
+        existing = self._existing(values for _, values in parsed)
+        references = self._missing_references(values for _, values in parsed)
+
+        inserts, updates = [], []
+        for index, values in parsed:
+            missing = [column for column, value in references if values.get(column) == value]
+            if missing:
+                results[index] = _error(index, f'قيمة غير موجودة: {", ".join(missing)}')
+                continue
+
+            # مفتاح مكرر داخل نفس الطلب
+            row_keys = [(key, values[key]) for key in self.keys if values.get(key)]
+            duplicate = next((seen_keys[k] for k in row_keys if k in seen_keys), None)
+            if duplicate is not None:
+                results[index] = _error(index, f'مكرر مع الصف {duplicate}')
+                continue
+
+            target = next((existing[k] for k in row_keys if k in existing), None)
+            if target is None:
+                absent = [name for name in self.required if values.get(self.fields[name]) in (None, '')]
+                if absent:
+                    results[index] = _error(index, f'الحقول مطلوبة: {", ".join(absent)}')
+                    continue
+                inserts.append((index, values))
+            elif target in seen_ids:
+                results[index] = _error(index, 'يطابق نفس السجل في صف سابق')
+                continue
+            else:
+                seen_ids.add(target)
+                updates.append((index, dict(values, id=target)))
+
+            seen_keys.update((k, index) for k in row_keys)
+
+        if not inserts and not updates:
+            return
+
+        try:
+            ids = []
+            if inserts:
+                ids = db.session.scalars(
+                    db.insert(self.model).returning(
+                        self.model.id, sort_by_parameter_order=True),
+                    [values for _, values in inserts]
+                ).all()
+            if updates:
+                db.session.execute(db.update(self.model), [values for _, values in updates])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for index, _ in inserts + updates:
+                results[index] = _error(index, str(e))
+            return
+
+        for (index, _), id in zip(inserts, ids):
+            results[index] = {'index': index, 'status': 'created', 'id': id}
+        for index, values in updates:
+            results[index] = {'index': index, 'status': 'updated', 'id': values['id']}
+
+    def _parse(self, row):
+        """تحويل الصف إلى {العمود: قيمة} مع التحقق من الأنواع والأطوال"""
+        if not isinstance(row, dict):
+            raise ValueError('الصف يجب أن يكون كائن JSON')
+
+        values = {}
+        for name, value in row.items():
+            if name not in self.fields:
+                continue
+            values[self.fields[name]] = _convert(name, self.columns[name], value)
+        return values
+
+    def _existing(self, rows):
+        """{(مفتاح، قيمة): id} للسجلات الموجودة (استعلام واحد لكل مفتاح)"""
+        rows = list(rows)
+        existing = {}
+        for key in self.keys:
+            values = {values[key] for values in rows if values.get(key)}
+            if not values:
+                continue
+            column = getattr(self.model, key)
+            query = db.session.query(column, self.model.id).filter(
+                column.in_(values)).order_by(self.model.id)
+            # عند تكرار القيمة في الجدول يُحدث أقدم سجل
+            for value, id in query:
+                existing.setdefault((key, value), id)
+        return existing
+
+    def _missing_references(self, rows):
+        """قيم المفاتيح الخارجية غير الموجودة [(العمود، القيمة)]"""
+        rows = list(rows)
+        missing = []
+        for column in self.columns.values():
+            for foreign_key in column.foreign_keys:
+                values = {values[column.key] for values in rows
+                          if values.get(column.key) is not None}
+                if not values:
+                    continue
+                target = foreign_key.column
+                found = {value for value, in db.session.query(target).filter(target.in_(values))}
+                missing += [(column.key, value) for value in values - found]
+        return missing
+
+
+def _error(index, message):
+    return {'index': index, 'status': 'error', 'error': message}
+
+
+def _convert(name, column, value):
+    """تحويل قيمة JSON لنوع العمود"""
+    if value is None or value == '':
+        if not column.nullable:
+            raise ValueError(f'الحقل {name} مطلوب')
+        return None
+
+    try:
+        if isinstance(column.type, db.Boolean):
+            if not isinstance(value, bool):
+                raise ValueError
+            return value
+        if isinstance(column.type, db.Integer):
+            if isinstance(value, bool) or int(value) != float(value):
+                raise ValueError
+            return int(value)
+        if isinstance(column.type, db.Numeric):
+            if isinstance(value, bool):
+                raise ValueError
+            number = Decimal(str(value))
+            precision, scale = column.type.precision, column.type.scale or 0
+            if not number.is_finite() or \
+                    (precision and abs(number) >= 10 ** (precision - scale)):
+                raise ValueError
+            return number
+        if isinstance(column.type, (db.DateTime, db.Date)):
+            parsed = datetime.fromisoformat(value)
+            return parsed if isinstance(column.type, db.DateTime) else parsed.date()
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError(f'قيمة غير صالحة للحقل {name}')
+
+    if isinstance(value, (dict, list)):
+        raise ValueError(f'قيمة غير صالحة للحقل {name}')
+    value = str(value)
+    length = getattr(column.type, 'length', None)
+    if length and len(value) > length:
+        raise ValueError(f'الحقل {name} أطول من {length} حرف')
+    return value
+
+
+# نفس أسماء الحقول في POST/PUT /api/v2/products و /api/v2/customers
+PRODUCT_UPSERT = BulkUpsert(
+    Product,
+    fields={
+        'name': 'name',
+        'barcode': 'barcode',
+        'sku': 'sku',
+        'description': 'description',
+        'category_id': 'category_id',
+        'price': 'cash_price',
+        'installment_price': 'installment_price',
+        'cost_price': 'cost_price',
+        'stock_quantity': 'quantity',
+        'min_stock': 'min_quantity',
+        'brand': 'brand',
+        'model': 'model',
+        'warranty_months': 'warranty_months',
+        'is_active': 'is_active',
+    },
+    keys=('barcode', 'sku'),
+    required=('name', 'price')
+)
+
+CUSTOMER_UPSERT = BulkUpsert(
+    Customer,
+    fields={
+        'full_name': 'full_name',
+        'phone': 'phone',
+        'phone2': 'phone2',
+        'national_id': 'national_id',
+        'address': 'address',
+        'city': 'city',
+        'work_address': 'work_address',
+        'work_phone': 'work_phone',
+        'guarantor_name': 'guarantor_name',
+        'guarantor_phone': 'guarantor_phone',
+        'guarantor_national_id': 'guarantor_national_id',
+        'credit_limit': 'credit_limit',
+        'notes': 'notes',
+        'is_active': 'is_active',
+    },
+    keys=('phone', 'national_id'),
+    required=('full_name', 'phone')
+)
@@ -0,0 +1,171 @@
+"""
+توقع التدفق النقدي من الأقساط المستقبلية
+
+المبالغ المجدولة تُجمع في قاعدة البيانات لكل يوم استحقاق ثم تُوزع على
+الفترات (أسبوع / شهر). اختيارياً تُطبق نسب التحصيل التاريخية: نسبة ما
+يُحصل من القسط في فترة استحقاقه، وفي الفترة التالية، وهكذا، فيكون
+المتوقع تحصيله في كل فترة = مجموع (المجدول × نسبة التأخير المناظرة).
+"""
+from datetime import date, timedelta
+from dateutil.relativedelta import relativedelta
+from app import db
+from app.models.installment import Installment
+from app.models.invoice import Invoice
+from app.models.payment import Payment
+from app.services.report_cache import cached
+
+# عدد الفترات الافتراضي لكل نوع
+FORECAST_HORIZONS = {'week': 12, 'month': 6}
+
+# الأقساط المستحقة خلال هذه المدة تُستخدم لحساب نسب التحصيل
+HISTORY_DAYS = 365
+
+# أقصى تأخير (بالفترات) يُحتسب في نسب التحصيل
+MAX_LAG = 3
+
+
+def _period_index(day, start, period):
+    """رقم الفترة التي يقع فيها اليوم (0 = الفترة الحالية)"""
+    if period == 'week':
+        return (day - start).days // 7
+    return (day.year - start.year) * 12 + day.month - start.month
+
+
+def _period_bounds(index, start, period):
+    """بداية ونهاية الفترة (النهاية غير مشمولة)"""
+    if period == 'week':
+        begin = start + timedelta(weeks=index)
+        return begin, begin + timedelta(weeks=1)
+    begin = start.replace(day=1) + relativedelta(months=index)
+    return begin, begin + relativedelta(months=1)
+
+
+def _outstanding_query(*columns):
+    """الأقساط غير المسددة لفواتير غير ملغاة"""
+    return db.session.query(*columns).select_from(Installment).join(
+        Invoice, Installment.invoice_id == Invoice.id
+    ).filter(
+        Installment.status.in_(['pending', 'partial', 'overdue']),
+        Invoice.status != 'cancelled'
+    )
+
+
+def _scheduled_amounts(start, period, horizon):
+    """المبالغ المجدولة لكل فترة"""
+    end = _period_bounds(horizon, start, period)[0]
+    due_amount = Installment.due_amount_expr()
+
+    rows = _outstanding_query(
+        Installment.due_date,
+        db.func.sum(due_amount)
+    ).filter(
+        Installment.due_date >= start,
+        Installment.due_date < end
+    ).group_by(Installment.due_date).all()
+
+    scheduled = [0.0] * horizon
+    for due_date, amount in rows:
+        index = _period_index(due_date, start, period)
+        if 0 <= index < horizon:
+            scheduled[index] += float(amount or 0)
+    return scheduled
+
+
+def get_collection_rates(period='week'):
+    """
+    نسب التحصيل حسب التأخير: rates[k] = نسبة ما يُحصل من مبلغ القسط
+    بعد k فترة من فترة استحقاقه (السداد المبكر يُحتسب في k = 0).
+    """
+    def build():
+        today = date.today()
+        # الأقساط القديمة بما يكفي لرصد كل فترات التأخير
+        observed_until = _period_bounds(-(MAX_LAG + 1), today, period)[0]
+        observed_from = today - timedelta(days=HISTORY_DAYS)
+
+        due_range = db.and_(
+            Installment.due_date >= observed_from,
+            Installment.due_date < observed_until
+        )
+
+        base = db.session.query(
+            db.func.coalesce(db.func.sum(Installment.amount), 0)
+        ).join(
+            Invoice, Installment.invoice_id == Invoice.id
+        ).filter(
+            due_range,
+            Invoice.status != 'cancelled'
+        ).scalar()
+
+        rows = db.session.query(
+            Installment.due_date,
+            db.func.date(Payment.payment_date, type_=db.Date),
+            db.func.sum(Payment.amount)
+        ).select_from(Payment).join(
+            Installment, Payment.installment_id == Installment.id
+        ).filter(
+            due_range
+        ).group_by(
+            Installment.due_date,
+            db.func.date(Payment.payment_date, type_=db.Date)
+        ).all()
+
+        collected = [0.0] * (MAX_LAG + 1)
+        for due_date, paid_on, amount in rows:
+            lag = _period_index(paid_on, due_date, period)
+            if lag <= MAX_LAG:
+                collected[max(lag, 0)] += float(amount or 0)
+
+        base = float(base or 0)
+        return [round(c / base, 4) if base else 0.0 for c in collected]
+
+    return cached('forecast', ('rates', period), build)
+
+
+def get_forecast(period='week', horizon=None, apply_rates=False):
+    """توقع التحصيل لكل فترة قادمة"""
+    if period not in FORECAST_HORIZONS:
+        period = 'week'
+    horizon = max(1, min(horizon or FORECAST_HORIZONS[period], 52))
+
+    def build():
+        today = date.today()
+        scheduled = _scheduled_amounts(today, period, horizon)
+
+        backlog = _outstanding_query(
+            db.func.coalesce(db.func.sum(Installment.due_amount_expr()), 0)
+        ).filter(
+            Installment.due_date < today
+        ).scalar()
+
+        expected = None
+        rates = None
+        if apply_rates:
+            rates = get_collection_rates(period)
+            # expected[j] = Σ scheduled[i] × rates[j - i]
+            expected = [
+                sum(scheduled[j - lag] * rate
+                    for lag, rate in enumerate(rates) if lag <= j)
+                for j in range(horizon)
+            ]
+
+        periods = []
+        for i in range(horizon):
+            begin, end = _period_bounds(i, today, period)
+            periods.append({
+                'start': max(begin, today).isoformat(),
+                'end': (end - timedelta(days=1)).isoformat(),
+                'scheduled': round(scheduled[i], 2),
+                'expected': round(expected[i], 2) if expected else None,
+            })
+
+        return {
+            'as_of': today.isoformat(),
+            'period': period,
+            'periods': periods,
+            'total_scheduled': round(sum(scheduled), 2),
+            'total_expected': round(sum(expected), 2) if expected else None,
+            'overdue_backlog': float(backlog or 0),
+            'collection_rates': rates,
+        }
+
+    return cached('forecast', (period, horizon, apply_rates), build)
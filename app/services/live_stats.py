@@ -0,0 +1,125 @@
+"""
+ناشر إحصائيات لوحة التحكم المباشرة (Server-Sent Events)
+
+خيط واحد لكل عملية يحسب الإحصائيات مرة كل فترة ويوزعها على جميع
+المتصفحات المتصلة، بدلاً من أن يعيد كل متصفح تنفيذ الاستعلامات.
+"""
+import json
+import threading
+
+
+def _diff(old, new):
+    """المفاتيح التي تغيرت بين لقطتين (بشكل متداخل)"""
+    delta = {}
+    for key, value in new.items():
+        old_value = old.get(key)
+        if isinstance(value, dict) and isinstance(old_value, dict):
+            nested = _diff(old_value, value)
+            if nested:
+                delta[key] = nested
+        elif value != old_value:
+            delta[key] = value
+    return delta
+
+
+def _event(name, data):
+    """تنسيق حدث SSE"""
+    return f'event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+class StatsPublisher:
+    """حساب الإحصائيات مرة واحدة لكل فترة ونشرها للمشتركين"""
+
+    def __init__(self, interval=10, heartbeat=15):
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self._app = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._refresh = threading.Event()
+        self._snapshot = None
+        self._version = 0
+        self._subscribers = 0
+
+    def init_app(self, app):
+        """ربط الناشر بالتطبيق"""
+        self._app = app
+        self.interval = app.config.get('LIVE_STATS_INTERVAL', self.interval)
+        self.heartbeat = app.config.get('LIVE_STATS_HEARTBEAT', self.heartbeat)
+
+    def _ensure_started(self):
+        """تشغيل خيط الحساب عند أول مشترك"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='live-stats', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """حلقة الحساب الدورية"""
+        from app import db
+        from app.services.stats import get_dashboard_stats
+
+        while True:
+            if self._subscribers:
+                try:
+                    with self._app.app_context():
+                        snapshot = get_dashboard_stats()
+                        db.session.remove()
+                    self._publish(snapshot)
+                except Exception:
+                    self._app.logger.exception('فشل حساب إحصائيات لوحة التحكم')
+
+            self._refresh.wait(self.interval)
+            self._refresh.clear()
+
+    def _publish(self, snapshot):
+        """نشر لقطة جديدة إذا تغيرت"""
+        with self._changed:
+            if snapshot == self._snapshot:
+                return
+            self._snapshot = snapshot
+            self._version += 1
+            self._changed.notify_all()
+
+    def request_refresh(self):
+        """طلب إعادة حساب فورية (بعد فاتورة أو دفعة جديدة)"""
+        if self._subscribers:
+            self._refresh.set()
+
+    def stream(self):
+        """مولد أحداث SSE لمشترك واحد: لقطة كاملة ثم التغييرات فقط"""
+        with self._changed:
+            self._subscribers += 1
+        self._ensure_started()
+        self._refresh.set()
+
+        sent = None
+        version = 0
+        try:
+            while True:
+                with self._changed:
+                    if self._version == version:
+                        self._changed.wait(self.heartbeat)
+                    current_version, snapshot = self._version, self._snapshot
+
+                if current_version == version or snapshot is None:
+                    yield ': keep-alive\n\n'
+                    continue
+
+                if sent is None:
+                    yield _event('snapshot', snapshot)
+                else:
+                    delta = _diff(sent, snapshot)
+                    if delta:
+                        yield _event('delta', delta)
+
+                sent = snapshot
+                version = current_version
+        finally:
+            with self._changed:
+                self._subscribers -= 1
+
+
+stats_publisher = StatsPublisher()
@@ -0,0 +1,46 @@
+"""
+مهمة تحديث حالة الأقساط المتأخرة (تعمل مرة يومياً)
+"""
+from datetime import date
+from app import db
+from app.models.installment import Installment
+from app.models.setting import Setting
+
+# مفتاح قفل PostgreSQL الاستشاري الخاص بالمهمة
+OVERDUE_LOCK_KEY = 73110001
+LAST_RUN_SETTING = 'overdue_engine_last_run'
+
+
+def _acquire_lock():
+    """قفل يمنع تشغيل المهمة من أكثر من عامل في نفس الوقت"""
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return True
+
+    # يُحرر القفل تلقائياً عند انتهاء المعاملة
+    return db.session.execute(
+        db.text('SELECT pg_try_advisory_xact_lock(:key)'),
+        {'key': OVERDUE_LOCK_KEY}
+    ).scalar()
+
+
+def run_overdue_engine(force=False):
+    """
+    تحويل الأقساط المعلقة/الجزئية المستحقة إلى متأخرة.
+    ترجع عدد الأقساط المحدثة، أو None إذا كان عامل آخر يعمل أو تم التشغيل اليوم.
+    """
+    today = date.today().isoformat()
+
+    if not _acquire_lock():
+        db.session.rollback()
+        return None
+
+    if not force and Setting.get(LAST_RUN_SETTING) == today:
+        db.session.rollback()
+        return None
+
+    updated = Installment.update_overdue_status(commit=False)
+
+    # Setting.set ينفذ commit للتحديث وتاريخ التشغيل معاً
+    Setting.set(LAST_RUN_SETTING, today, group='system')
+
+    return updated
@@ -0,0 +1,205 @@
+"""
+أداء الموظفين: المبيعات والتحصيل لكل مستخدم
+
+المبيعات والتحصيل تُقرأ من جداول التجميع اليومي (مجمعة مسبقاً لكل
+يوم ومستخدم) فتبقى سريعة على بيانات سنوات، أو من الجداول الأصلية
+مباشرة عند source='live'. كفاءة التحصيل = المسدد ÷ المستحق من أقساط
+فواتير الموظف التي حل موعدها خلال الفترة.
+"""
+from app import db
+from app.models.daily_rollup import DailySalesRollup, DailyCollectionRollup
+from app.models.invoice import Invoice
+from app.models.installment import Installment
+from app.models.payment import Payment
+from app.models.user import User
+from app.utils.helpers import date_range_filter
+from app.utils.pagination import SqlPagination
+
+PERFORMANCE_SOURCES = ('rollup', 'live')
+
+
+def _sales_by_user(from_date, to_date, source):
+    """المبيعات لكل مستخدم (user_id = 0 للفواتير بدون مستخدم)"""
+    if source == 'live':
+        user_id = db.func.coalesce(Invoice.user_id, 0)
+        return db.select(
+            user_id.label('user_id'),
+            db.func.count(Invoice.id).label('invoices_count'),
+            db.func.sum(Invoice.total_amount).label('sales_total'),
+            db.func.sum(Invoice.total_amount).filter(
+                Invoice.invoice_type == 'cash').label('cash_total'),
+            db.func.sum(Invoice.total_amount).filter(
+                Invoice.invoice_type == 'installment').label('installment_total'),
+        ).where(
+            date_range_filter(Invoice.created_at, from_date, to_date),
+            Invoice.status != 'cancelled'
+        ).group_by(user_id).subquery()
+
+    rollup = DailySalesRollup
+    return db.select(
+        rollup.user_id,
+        db.func.sum(rollup.invoices_count).label('invoices_count'),
+        db.func.sum(rollup.total_amount).label('sales_total'),
+        db.func.sum(rollup.total_amount).filter(
+            rollup.invoice_type == 'cash').label('cash_total'),
+        db.func.sum(rollup.total_amount).filter(
+            rollup.invoice_type == 'installment').label('installment_total'),
+    ).where(
+        rollup.day >= from_date,
+        rollup.day <= to_date
+    ).group_by(rollup.user_id).subquery()
+
+
+def _collections_by_user(from_date, to_date, source):
+    """التحصيل لكل مستخدم"""
+    if source == 'live':
+        user_id = db.func.coalesce(Payment.user_id, 0)
+        return db.select(
+            user_id.label('user_id'),
+            db.func.count(Payment.id).label('payments_count'),
+            db.func.sum(Payment.amount).label('collected_total'),
+        ).where(
+            date_range_filter(Payment.payment_date, from_date, to_date)
+        ).group_by(user_id).subquery()
+
+    rollup = DailyCollectionRollup
+    return db.select(
+        rollup.user_id,
+        db.func.sum(rollup.payments_count).label('payments_count'),
+        db.func.sum(rollup.total_amount).label('collected_total'),
+    ).where(
+        rollup.day >= from_date,
+        rollup.day <= to_date
+    ).group_by(rollup.user_id).subquery()
+
+
+def _due_by_user(from_date, to_date):
+    """المستحق والمسدد من أقساط فواتير كل مستخدم خلال الفترة"""
+    user_id = db.func.coalesce(Invoice.user_id, 0)
+    return db.select(
+        user_id.label('user_id'),
+        db.func.sum(Installment.amount).label('due_total'),
+        db.func.sum(Installment.paid_amount_expr()).label('due_paid'),
+    ).select_from(Installment).join(
+        Invoice, Installment.invoice_id == Invoice.id
+    ).where(
+        Installment.due_date >= from_date,
+        Installment.due_date <= to_date,
+        Invoice.status != 'cancelled'
+    ).group_by(user_id).subquery()
+
+
+def _money(value):
+    """تحويل مبلغ إلى float"""
+    return float(value) if value is not None else 0
+
+
+def get_user_performance(from_date, to_date, page=1, per_page=20, source='rollup'):
+    """أداء كل مستخدم خلال فترة (مجمع في قاعدة البيانات ومقسم لصفحات)"""
+    sales = _sales_by_user(from_date, to_date, source)
+    collections = _collections_by_user(from_date, to_date, source)
+    due = _due_by_user(from_date, to_date)
+
+    # كل المستخدمين الذين لهم نشاط في أي من المصادر الثلاثة
+    user_ids = db.union(
+        db.select(sales.c.user_id),
+        db.select(collections.c.user_id),
+        db.select(due.c.user_id)
+    ).subquery()
+
+    sales_total = db.func.coalesce(sales.c.sales_total, 0)
+    collected_total = db.func.coalesce(collections.c.collected_total, 0)
+
+    query = db.session.query(
+        user_ids.c.user_id,
+        User.full_name,
+        User.role,
+        db.func.coalesce(sales.c.invoices_count, 0).label('invoices_count'),
+        sales_total.label('sales_total'),
+        sales.c.cash_total,
+        sales.c.installment_total,
+        db.func.coalesce(collections.c.payments_count, 0).label('payments_count'),
+        collected_total.label('collected_total'),
+        due.c.due_total,
+        due.c.due_paid,
+    ).select_from(user_ids).outerjoin(
+        User, User.id == user_ids.c.user_id
+    ).outerjoin(
+        sales, sales.c.user_id == user_ids.c.user_id
+    ).outerjoin(
+        collections, collections.c.user_id == user_ids.c.user_id
+    ).outerjoin(
+        due, due.c.user_id == user_ids.c.user_id
+    ).order_by(
+        (sales_total + collected_total).desc(), user_ids.c.user_id
+    )
+
+    pagination = SqlPagination(query, page, per_page)
+    pagination.items = [{
+        'user_id': r.user_id or None,
+        'user_name': r.full_name or 'بدون مستخدم',
+        'role': r.role,
+        'invoices_count': int(r.invoices_count),
+        'sales_total': _money(r.sales_total),
+        'cash_total': _money(r.cash_total),
+        'installment_total': _money(r.installment_total),
+        'payments_count': int(r.payments_count),
+        'collected_total': _money(r.collected_total),
+        'due_total': _money(r.due_total),
+        'due_paid': _money(r.due_paid),
+        'collection_efficiency': round(_money(r.due_paid) / _money(r.due_total), 4)
+        if r.due_total else None,
+    } for r in pagination.items]
+    return pagination
+
+
+def get_user_timeline(user_id, from_date, to_date, period='day'):
+    """مبيعات وتحصيل مستخدم واحد لكل يوم أو شهر (من جداول التجميع)"""
+    user_key = user_id or 0
+
+    sales = db.session.query(
+        DailySalesRollup.day,
+        db.func.sum(DailySalesRollup.invoices_count),
+        db.func.sum(DailySalesRollup.total_amount)
+    ).filter(
+        DailySalesRollup.user_id == user_key,
+        DailySalesRollup.day >= from_date,
+        DailySalesRollup.day <= to_date
+    ).group_by(DailySalesRollup.day).all()
+
+    collections = db.session.query(
+        DailyCollectionRollup.day,
+        db.func.sum(DailyCollectionRollup.payments_count),
+        db.func.sum(DailyCollectionRollup.total_amount)
+    ).filter(
+        DailyCollectionRollup.user_id == user_key,
+        DailyCollectionRollup.day >= from_date,
+        DailyCollectionRollup.day <= to_date
+    ).group_by(DailyCollectionRollup.day).all()
+
+    def period_key(day):
+        return day.replace(day=1) if period == 'month' else day
+
+    timeline = {}
+
+    def bucket(day):
+        return timeline.setdefault(period_key(day), {
+            'invoices_count': 0, 'sales_total': 0.0,
+            'payments_count': 0, 'collected_total': 0.0,
+        })
+
+    for day, count, total in sales:
+        row = bucket(day)
+        row['invoices_count'] += int(count or 0)
+        row['sales_total'] += _money(total)
+
+    for day, count, total in collections:
+        row = bucket(day)
+        row['payments_count'] += int(count or 0)
+        row['collected_total'] += _money(total)
+
+    return [
+        dict(period=key.isoformat() if period == 'day' else key.strftime('%Y-%m'), **values)
+        for key, values in sorted(timeline.items())
+        if values['invoices_count'] or values['payments_count']
+    ]
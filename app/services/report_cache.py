@@ -0,0 +1,185 @@
+"""
+ذاكرة تخزين نتائج التقارير (LRU محدودة بعدد العناصر والحجم)
+
+كل نتيجة مختومة بنسخة البيانات وقت حسابها، والنسخة تتغير مع أي كتابة
+على الفواتير أو الأقساط أو المدفوعات أو جداول التجميع، فلا تُرجع نتيجة قديمة أبداً:
+- عداد داخل العملية يزيد بعد commit يلمس هذه الجداول (أحداث ORM).
+- علامة من قاعدة البيانات (آخر دفعة وآخر تعديل على الفواتير والأقساط
+  ونسخة جداول التجميع) تلتقط الكتابات من العمليات الأخرى مثل
+  Gunicorn و flask rebuild-rollups.
+- تاريخ اليوم (تقارير التأخير والتوقع تعتمد عليه).
+"""
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+
+# الجداول التي تغير نتائج التقارير عند الكتابة عليها
+TRACKED_TABLES = frozenset({
+    'invoices', 'invoice_items', 'installments', 'payments',
+    'daily_sales_rollup', 'daily_collection_rollup',
+})
+
+
+def _size_of(value):
+    """حجم تقريبي للنتيجة بالبايت"""
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def _touches_tracked(objects):
+    """هل تحتوي الكائنات على صف من الجداول المتتبعة؟"""
+    return any(getattr(obj, '__tablename__', None) in TRACKED_TABLES for obj in objects)
+
+
+class ReportCache:
+    """LRU لنتائج التقارير مع عدادات الإصابة والإخفاق"""
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._local_version = 0
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0, 'evictions': 0, 'skipped': 0}
+
+    def init_app(self, app):
+        """ربط الذاكرة بالتطبيق وتسجيل أحداث ORM لزيادة العداد"""
+        self.max_entries = app.config.get('REPORT_CACHE_MAX_ENTRIES', self.max_entries)
+        self.max_bytes = app.config.get('REPORT_CACHE_MAX_BYTES', self.max_bytes)
+
+        if not event.contains(Session, 'after_flush', _after_flush):
+            event.listen(Session, 'after_flush', _after_flush)
+            event.listen(Session, 'do_orm_execute', _on_orm_execute)
+            event.listen(Session, 'after_commit', _after_commit)
+            event.listen(Session, 'after_rollback', _after_rollback)
+
+    def bump(self):
+        """تغيير نسخة البيانات داخل العملية (بعد كتابة)"""
+        with self._lock:
+            self._local_version += 1
+
+    def _db_watermark(self):
+        """علامة الكتابات من قاعدة البيانات (استعلام واحد على فهارس)"""
+        from app.models.invoice import Invoice
+        from app.models.installment import Installment
+        from app.models.payment import Payment
+        from app.models.setting import Setting
+        from app.models.daily_rollup import ROLLUP_VERSION_KEY
+
+        if has_request_context() and 'report_cache_watermark' in g:
+            return g.report_cache_watermark
+
+        watermark = tuple(db.session.query(
+            db.select(db.func.max(Payment.id)).scalar_subquery(),
+            db.select(db.func.max(Invoice.updated_at)).scalar_subquery(),
+            db.select(db.func.max(Installment.updated_at)).scalar_subquery(),
+            db.select(Setting.setting_value).where(
+                Setting.setting_key == ROLLUP_VERSION_KEY).scalar_subquery(),
+        ).one())
+
+        if has_request_context():
+            g.report_cache_watermark = watermark
+        return watermark
+
+    def data_version(self):
+        """نسخة البيانات الحالية"""
+        return (date.today(), self._local_version) + self._db_watermark()
+
+    def get_or_compute(self, report, params, builder):
+        """نتيجة التقرير من الذاكرة أو حسابها وتخزينها"""
+        key = (report, params)
+        version = self.data_version()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[1]
+
+            self._stats['misses'] += 1
+            if entry is not None:
+                self._stats['stale'] += 1
+                self._remove(key)
+
+        value = builder()
+        size = _size_of(value)
+
+        with self._lock:
+            if size > self.max_bytes:
+                self._stats['skipped'] += 1
+                return value
+
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, value, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+        return value
+
+    def _remove(self, key):
+        """حذف عنصر (يُستدعى مع القفل)"""
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        """تفريغ الذاكرة"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """إحصائيات للمراقبة"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_entries=self.max_entries,
+                max_bytes=self.max_bytes,
+                hit_ratio=round(self._stats['hits'] / lookups, 4) if lookups else None,
+            )
+
+
+report_cache = ReportCache()
+
+
+def _after_flush(session, flush_context):
+    if _touches_tracked(session.new) or _touches_tracked(session.dirty) or \
+            _touches_tracked(session.deleted):
+        session.info['report_cache_dirty'] = True
+
+
+def _on_orm_execute(state):
+    # التحديث والحذف الجماعي (مثل مهمة تحديث التأخير) لا يمر بـ flush
+    if (state.is_update or state.is_delete) and state.bind_mapper is not None and \
+            state.bind_mapper.local_table.name in TRACKED_TABLES:
+        state.session.info['report_cache_dirty'] = True
+
+
+def _after_commit(session):
+    if session.info.pop('report_cache_dirty', False):
+        report_cache.bump()
+
+
+def _after_rollback(session):
+    session.info.pop('report_cache_dirty', None)
+
+
+def cached(report, params, builder):
+    """نتيجة builder() مخزنة حتى تتغير نسخة البيانات"""
+    return report_cache.get_or_compute(report, params, builder)
@@ -0,0 +1,196 @@
+"""
+استعلامات تصدير التقارير (مشتركة بين التنزيل المباشر ومهام الخلفية)
+
+كل تقرير يرجع (العناوين، الاستعلام، دالة تحويل الصف) بحيث تُقرأ الصفوف
+من مؤشر قاعدة البيانات على دفعات دون تحميل النتيجة كاملة.
+"""
+from datetime import date, datetime
+from app import db
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.payment import Payment
+from app.models.product import Product
+from app.models.installment import Installment
+from app.models.customer import Customer
+from app.models.category import Category
+from app.models.user import User
+from app.utils.export import YIELD_PER
+from app.utils.helpers import (
+    date_range_filter, invoice_type_label, invoice_status_label, payment_method_label
+)
+
+# التقارير التي تعتمد على فترة زمنية
+DATE_RANGE_REPORTS = ('profits', 'sales', 'collections')
+
+
+def parse_report_dates(params):
+    """فترة التقرير من المعاملات (الافتراضي: بداية الشهر حتى اليوم)"""
+    today = date.today()
+    from_str = params.get('from') or today.replace(day=1).isoformat()
+    to_str = params.get('to') or today.isoformat()
+    return (datetime.strptime(from_str, '%Y-%m-%d').date(),
+            datetime.strptime(to_str, '%Y-%m-%d').date())
+
+
+def normalize_report_params(report, params):
+    """معاملات التقرير بصيغة ثابتة (تُستخدم كمفتاح للنتائج المخزنة)"""
+    normalized = {}
+    if report in DATE_RANGE_REPORTS:
+        from_date, to_date = parse_report_dates(params)
+        normalized['from'] = from_date.isoformat()
+        normalized['to'] = to_date.isoformat()
+    return normalized
+
+
+def profits_query(from_date, to_date):
+    """الأرباح لكل منتج (مجمعة في قاعدة البيانات)"""
+    return db.session.query(
+        InvoiceItem.product_id,
+        InvoiceItem.product_name,
+        db.func.sum(InvoiceItem.quantity).label('total_qty'),
+        db.func.sum(InvoiceItem.total_price).label('revenue'),
+        db.func.sum(
+            InvoiceItem.quantity * db.func.coalesce(InvoiceItem.unit_cost, 0)
+        ).label('cost')
+    ).join(Invoice).filter(
+        date_range_filter(Invoice.created_at, from_date, to_date),
+        Invoice.status != 'cancelled'
+    ).group_by(
+        InvoiceItem.product_id,
+        InvoiceItem.product_name
+    )
+
+
+def _profits(params):
+    from_date, to_date = parse_report_dates(params)
+    query = profits_query(from_date, to_date).order_by(
+        db.desc('revenue'), InvoiceItem.product_id)
+
+    def row(r):
+        return (r.product_name, r.total_qty, r.revenue, r.cost,
+                (r.revenue or 0) - (r.cost or 0))
+
+    return ['المنتج', 'الكمية', 'الإيرادات', 'التكلفة', 'الربح'], query, row
+
+
+def _sales(params):
+    from_date, to_date = parse_report_dates(params)
+    query = db.session.query(
+        Invoice.invoice_number,
+        Invoice.created_at,
+        Invoice.invoice_type,
+        Customer.full_name,
+        User.full_name,
+        Invoice.total_amount,
+        Invoice.paid_amount,
+        Invoice.remaining_amount,
+        Invoice.status
+    ).outerjoin(
+        Customer, Invoice.customer_id == Customer.id
+    ).outerjoin(
+        User, Invoice.user_id == User.id
+    ).filter(
+        date_range_filter(Invoice.created_at, from_date, to_date),
+        Invoice.status != 'cancelled'
+    ).order_by(Invoice.created_at)
+
+    def row(r):
+        return (r[0], r[1], invoice_type_label(r[2]), r[3], r[4],
+                r[5], r[6], r[7], invoice_status_label(r[8]))
+
+    return (['رقم الفاتورة', 'التاريخ', 'النوع', 'العميل', 'الموظف',
+             'الإجمالي', 'المدفوع', 'المتبقي', 'الحالة'], query, row)
+
+
+def _collections(params):
+    from_date, to_date = parse_report_dates(params)
+    query = db.session.query(
+        Payment.receipt_number,
+        Payment.payment_date,
+        Invoice.invoice_number,
+        Customer.full_name,
+        Payment.amount,
+        Payment.payment_method,
+        User.full_name
+    ).join(
+        Invoice, Payment.invoice_id == Invoice.id
+    ).outerjoin(
+        Customer, Invoice.customer_id == Customer.id
+    ).outerjoin(
+        User, Payment.user_id == User.id
+    ).filter(
+        date_range_filter(Payment.payment_date, from_date, to_date)
+    ).order_by(Payment.payment_date)
+
+    def row(r):
+        return (r[0], r[1], r[2], r[3], r[4], payment_method_label(r[5]), r[6])
+
+    return (['رقم الإيصال', 'التاريخ', 'الفاتورة', 'العميل', 'المبلغ',
+             'طريقة الدفع', 'الموظف'], query, row)
+
+
+def _overdue(params):
+    today = date.today()
+    query = db.session.query(
+        Customer.full_name,
+        Customer.phone,
+        Invoice.invoice_number,
+        Installment.installment_number,
+        Installment.due_amount_expr(),
+        Installment.due_date
+    ).select_from(Installment).join(
+        Invoice, Installment.invoice_id == Invoice.id
+    ).join(
+        Customer, Invoice.customer_id == Customer.id
+    ).filter(
+        Installment.overdue_filter(today)
+    ).order_by(Customer.id, Installment.due_date)
+
+    def row(r):
+        return (*r, (today - r[5]).days)
+
+    return (['العميل', 'الهاتف', 'الفاتورة', 'رقم القسط', 'المبلغ المستحق',
+             'تاريخ الاستحقاق', 'أيام التأخير'], query, row)
+
+
+def _inventory(params):
+    query = db.session.query(
+        Product.name,
+        Product.barcode,
+        Category.name,
+        Product.quantity,
+        Product.min_quantity,
+        Product.cost_price,
+        Product.cash_price
+    ).outerjoin(
+        Category, Product.category_id == Category.id
+    ).filter(
+        Product.is_active == True
+    ).order_by(Product.name)
+
+    def row(r):
+        return (r[0], r[1], r[2], r[3], r[4], r[5], r[6],
+                (r[5] or 0) * (r[3] or 0),
+                'نعم' if (r[3] or 0) <= (r[4] or 0) else 'لا')
+
+    return (['المنتج', 'الباركود', 'التصنيف', 'الكمية', 'الحد الأدنى',
+             'سعر التكلفة', 'سعر البيع', 'قيمة المخزون', 'مخزون منخفض'], query, row)
+
+
+REPORT_EXPORTS = {
+    'profits': _profits,
+    'sales': _sales,
+    'collections': _collections,
+    'overdue': _overdue,
+    'inventory': _inventory,
+}
+
+
+def build_report_export(report, params):
+    """(العناوين، الاستعلام، دالة تحويل الصف) لتقرير معين"""
+    return REPORT_EXPORTS[report](params)
+
+
+def iter_report_rows(query, row):
+    """قراءة صفوف التقرير من مؤشر قاعدة البيانات على دفعات"""
+    for r in query.yield_per(YIELD_PER):
+        yield row(r)
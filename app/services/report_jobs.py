@@ -0,0 +1,217 @@
+"""
+تنفيذ التقارير الكبيرة في الخلفية
+
+الطلب يسجل مهمة في جدول report_jobs ويرجع فوراً، وعملية منفصلة
+(flask report-worker) تنفذها وتكتب النتيجة على القرص، فلا ينشغل
+عامل WSGI بتقرير طويل. النتائج تُعاد استخدامها لنفس المعاملات.
+"""
+import hashlib
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models.report_job import ReportJob
+from app.services.report_cache import report_cache
+from app.utils.export import YIELD_PER, csv_stream, xlsx_stream
+from app.services.report_exports import (
+    REPORT_EXPORTS, build_report_export, iter_report_rows, normalize_report_params
+)
+
+# أقل فترة بين تحديثين لنسبة التقدم (ثواني)
+PROGRESS_INTERVAL = 1.0
+
+
+def results_dir():
+    """مجلد حفظ نتائج التقارير"""
+    path = current_app.config.get('REPORT_RESULTS_DIR') or os.path.join(
+        os.path.dirname(current_app.root_path), 'report_results')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def data_version():
+    """بصمة نسخة البيانات الحالية (نفس نسخة ذاكرة التقارير)"""
+    version = repr(report_cache.data_version())
+    return hashlib.sha256(version.encode('utf-8')).hexdigest()
+
+
+def submit_job(report, params, export_format='csv', user_id=None):
+    """تسجيل مهمة تقرير (أو إرجاع مهمة قائمة بنفس المعاملات)"""
+    if report not in REPORT_EXPORTS:
+        raise ValueError('تقرير غير معروف')
+    if export_format not in ('csv', 'xlsx'):
+        raise ValueError('صيغة غير مدعومة')
+
+    params = normalize_report_params(report, params)
+    params_hash = ReportJob.make_hash(report, params, export_format)
+
+    version = data_version()
+
+    job = ReportJob.find_reusable(
+        params_hash, current_app.config['REPORT_RESULT_TTL'], user_id, version)
+    if job and (job.status != 'done' or job.has_result):
+        return job
+
+    job = ReportJob(
+        report=report,
+        params=params,
+        export_format=export_format,
+        params_hash=params_hash,
+        data_version=version,
+        status='queued',
+        created_by=user_id
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def _update_job(job_id, **values):
+    """تحديث المهمة عبر اتصال مستقل (لا يقطع مؤشر القراءة المفتوح)"""
+    with db.engine.begin() as conn:
+        conn.execute(
+            db.update(ReportJob.__table__)
+            .where(ReportJob.__table__.c.id == job_id)
+            .values(**values)
+        )
+
+
+def run_job(job):
+    """تنفيذ مهمة واحدة وكتابة النتيجة على القرص"""
+    job_id = job.id
+    path = os.path.join(results_dir(), f'{job_id}_{job.report}.{job.export_format}')
+    partial_path = path + '.part'
+
+    try:
+        headers, query, row = build_report_export(job.report, job.params)
+        total = query.order_by(None).count()
+        _update_job(job_id, total_rows=total)
+
+        state = {'written': 0, 'reported_at': time.monotonic()}
+
+        def tracked_rows():
+            for values in iter_report_rows(query, row):
+                yield values
+                state['written'] += 1
+                now = time.monotonic()
+                if state['written'] % YIELD_PER == 0 and \
+                        now - state['reported_at'] >= PROGRESS_INTERVAL:
+                    state['reported_at'] = now
+                    _update_job(
+                        job_id,
+                        rows_written=state['written'],
+                        progress=min(99, state['written'] * 100 // max(total, 1))
+                    )
+
+        if job.export_format == 'xlsx':
+            chunks = xlsx_stream(headers, tracked_rows(), sheet_name=job.report[:31])
+        else:
+            chunks = csv_stream(headers, tracked_rows())
+
+        with open(partial_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(partial_path, path)
+
+        db.session.rollback()
+        _update_job(
+            job_id,
+            status='done',
+            progress=100,
+            rows_written=state['written'],
+            result_path=path,
+            finished_at=datetime.utcnow()
+        )
+    except Exception as e:
+        db.session.rollback()
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        current_app.logger.exception(f'فشل تنفيذ مهمة التقرير {job_id}')
+        _update_job(
+            job_id,
+            status='failed',
+            error=str(e),
+            finished_at=datetime.utcnow()
+        )
+
+
+def requeue_stale_jobs():
+    """إرجاع المهام العالقة (توقف العامل أثناء تنفيذها) للانتظار"""
+    started_before = datetime.utcnow() - timedelta(
+        seconds=current_app.config['REPORT_JOB_TIMEOUT'])
+    count = ReportJob.query.filter(
+        ReportJob.status == 'running',
+        ReportJob.started_at < started_before
+    ).update({'status': 'queued'}, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def purge_expired_results():
+    """حذف ملفات النتائج الأقدم من مدة الصلاحية"""
+    finished_before = datetime.utcnow() - timedelta(
+        seconds=current_app.config['REPORT_RESULT_TTL'])
+    jobs = ReportJob.query.filter(
+        ReportJob.status.in_(['done', 'failed']),
+        ReportJob.finished_at < finished_before
+    ).all()
+
+    for job in jobs:
+        if job.result_path and os.path.exists(job.result_path):
+            os.remove(job.result_path)
+        db.session.delete(job)
+    db.session.commit()
+    return len(jobs)
+
+
+def _execute(app, job_id, slots):
+    """تنفيذ مهمة داخل خيط من مجموعة العامل"""
+    try:
+        with app.app_context():
+            job = db.session.get(ReportJob, job_id)
+            run_job(job)
+            db.session.remove()
+    finally:
+        slots.release()
+
+
+def run_worker(app, threads=2, poll=2, once=False):
+    """
+    حلقة العامل: حجز المهام المنتظرة وتنفيذها بمجموعة خيوط.
+    once=True: تنفيذ المهام الموجودة ثم الخروج (مناسب لـ cron).
+    """
+    slots = threading.Semaphore(threads)
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='report-job')
+
+    with app.app_context():
+        requeue_stale_jobs()
+        purge_expired_results()
+    purged_at = time.monotonic()
+
+    try:
+        while True:
+            slots.acquire()
+            with app.app_context():
+                job = ReportJob.claim_next()
+                job_id = job.id if job else None
+                db.session.remove()
+
+            if job_id is not None:
+                executor.submit(_execute, app, job_id, slots)
+                continue
+
+            slots.release()
+            if once:
+                break
+
+            if time.monotonic() - purged_at >= 3600:
+                with app.app_context():
+                    purge_expired_results()
+                purged_at = time.monotonic()
+
+            time.sleep(poll)
+    finally:
+        executor.shutdown(wait=True)
@@ -0,0 +1,36 @@
+"""
+خدمة إحصائيات لوحة التحكم
+"""
+from datetime import date
+from app.models.daily_rollup import DailySalesRollup
+from app.models.installment import Installment
+from app.models.payment import Payment
+
+
+def get_sales_stats_by_type(day=None):
+    """عدد وإجمالي الفواتير لكل نوع في يوم معين (من جدول التجميع اليومي)"""
+    day = day or date.today()
+    return DailySalesRollup.get_totals_by_type(day, day)
+
+
+def get_today_sales_stats():
+    """إحصائيات مبيعات اليوم (نقدي / تقسيط)"""
+    by_type = get_sales_stats_by_type()
+    cash = by_type.get('cash', {'count': 0, 'total': 0})
+    installment = by_type.get('installment', {'count': 0, 'total': 0})
+
+    return {
+        'cash_count': cash['count'],
+        'cash_total': cash['total'],
+        'installment_count': installment['count'],
+        'installment_total': installment['total'],
+    }
+
+
+def get_dashboard_stats():
+    """إحصائيات لوحة التحكم المحدثة (AJAX و البث المباشر)"""
+    return {
+        'today': get_today_sales_stats(),
+        'installments': Installment.get_stats(),
+        'payments': Payment.get_today_total()
+    }
@@ -137,6 +137,64 @@ async function confirmDeleteAction(url, message = 'هل أنت متأكد من 
     }
 }
 
+// Background Report Job (تجهيز التقرير في الخلفية ثم تنزيله)
+async function runReportJob(url, payload, csrfToken, button) {
+    const label = button ? button.innerHTML : '';
+    if (button) button.disabled = true;
+
+    try {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-Requested-With': 'XMLHttpRequest',
+                'X-CSRFToken': csrfToken
+            },
+            body: JSON.stringify(payload)
+        });
+
+        let data = await response.json();
+        if (!data.success) {
+            showAlert('error', data.message);
+            return;
+        }
+
+        let job = data.job;
+        if (!job.download_url) {
+            showAlert('info', 'جار تجهيز التقرير في الخلفية، سيبدأ التنزيل عند الانتهاء');
+        }
+
+        while (job.status === 'queued' || job.status === 'running') {
+            if (button) {
+                button.innerHTML = `<span class="material-icons-round">hourglass_empty</span> ${job.progress || 0}%`;
+            }
+            await new Promise(resolve => setTimeout(resolve, 2000));
+
+            data = await (await fetch(job.status_url, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' }
+            })).json();
+            if (!data.success) {
+                showAlert('error', data.message);
+                return;
+            }
+            job = data.job;
+        }
+
+        if (job.download_url) {
+            location.href = job.download_url;
+        } else {
+            showAlert('error', job.error || 'فشل تجهيز التقرير');
+        }
+    } catch (error) {
+        showAlert('error', 'حدث خطأ أثناء العملية');
+    } finally {
+        if (button) {
+            button.disabled = false;
+            button.innerHTML = label;
+        }
+    }
+}
+
 // Format Money
 function formatMoney(amount, currency = 'ج.م') {
     if (amount === null || amount === undefined) amount = 0;
@@ -1,10 +1,14 @@
 """
 Decorators للصلاحيات
 """
+import hashlib
 from functools import wraps
-from flask import flash, redirect, url_for, jsonify, request
+from flask import flash, redirect, url_for, jsonify, request, make_response
 from flask_login import current_user
 
+# مفتاح الـ environ الذي يحمل بيانات مفتاح API للطلبات الفرعية في /api/v2/batch
+BATCH_API_KEY_ENVIRON = 'taqsit.api_key'
+
 
 def admin_required(f):
     """يتطلب صلاحية مدير"""
@@ -50,6 +54,12 @@ def api_key_required(f):
     def decorated_function(*args, **kwargs):
         from app.models.api_key import ApiKey
 
+        # الطلبات الفرعية في /batch: المفتاح تم التحقق منه مرة واحدة للدفعة كلها
+        key_data = request.environ.get(BATCH_API_KEY_ENVIRON)
+        if key_data is not None:
+            request.api_key = key_data
+            return f(*args, **kwargs)
+
         # جلب المفتاح من الـ Header
         api_key = request.headers.get('X-API-KEY')
 
@@ -77,6 +87,47 @@ def api_key_required(f):
     return decorated_function
 
 
+def _table_versions(models):
+    """نسخة الجداول: (أحدث updated_at، عدد الصفوف) لكل جدول في استعلام واحد"""
+    from app import db
+
+    columns = []
+    for model in models:
+        columns.append(db.select(db.func.max(model.updated_at)).scalar_subquery())
+        columns.append(db.select(db.func.count()).select_from(model).scalar_subquery())
+    return tuple(db.session.query(*columns).one())
+
+
+def conditional_get(*models):
+    """
+    ETag من نسخة الجداول التي تعتمد عليها الاستجابة ومعاملات الطلب.
+    If-None-Match المطابق يرجع 304 بدون تنفيذ الاستعلام أو التحويل لـ JSON.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            stamp = repr((
+                request.path,
+                sorted(request.args.items(multi=True)),
+                _table_versions(models)
+            ))
+            etag = hashlib.sha1(stamp.encode()).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            # العميل يحتفظ بالنسخة لكن يتحقق منها في كل طلب
+            response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
+
+
 def log_activity(action, entity_type=None):
     """تسجيل النشاط تلقائياً"""
     def decorator(f):
@@ -0,0 +1,192 @@
+"""
+تصدير التقارير (CSV / Excel / NDJSON) بشكل متدفق بذاكرة ثابتة
+"""
+import csv
+import io
+import json
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+from flask import Response, stream_with_context
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+# عدد الصفوف التي تُجمع قبل إرسالها للمتصفح
+CHUNK_ROWS = 500
+
+# عدد الصفوف التي تُجلب من مؤشر قاعدة البيانات في كل دفعة
+YIELD_PER = 1000
+
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _cell_text(value):
+    """تحويل قيمة لنص قابل للكتابة"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return format(value, 'f')
+    return str(value)
+
+
+def csv_stream(headers, rows):
+    """مولد CSV (UTF-8 مع BOM ليفتح بشكل صحيح في Excel)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+
+    for i, row in enumerate(rows, 1):
+        writer.writerow([_cell_text(v) for v in row])
+        if i % CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkWriter(io.RawIOBase):
+    """ملف كتابة فقط غير قابل للتنقل يجمع البيانات لإرسالها على دفعات"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _xlsx_row(values):
+    """صف XML لورقة العمل"""
+    cells = []
+    for value in values:
+        if isinstance(value, bool) or value is None:
+            value = _cell_text(value)
+        if isinstance(value, (int, float, Decimal)):
+            cells.append(f'<c><v>{_cell_text(value)}</v></c>')
+        else:
+            text = escape(_ILLEGAL_XML_CHARS.sub('', _cell_text(value)))
+            cells.append(f'<c t="inlineStr"><is><t>{text}</t></is></c>')
+    return '<row>' + ''.join(cells) + '</row>'
+
+
+def xlsx_stream(headers, rows, sheet_name='Report'):
+    """مولد ملف Excel (xlsx) يُكتب ويُرسل أثناء قراءة الصفوف"""
+    out = _ChunkWriter()
+
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _ROOT_RELS)
+        zf.writestr('xl/workbook.xml', _WORKBOOK.format(name=escape(sheet_name)))
+        zf.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetViews><sheetView rightToLeft="1" workbookViewId="0"/></sheetViews>'
+                '<sheetData>'
+            ).encode('utf-8'))
+            sheet.write(_xlsx_row(headers).encode('utf-8'))
+
+            for i, row in enumerate(rows, 1):
+                sheet.write(_xlsx_row(row).encode('utf-8'))
+                if i % CHUNK_ROWS == 0:
+                    yield out.drain()
+
+            sheet.write(b'</sheetData></worksheet>')
+
+    yield out.drain()
+
+
+def ndjson_stream(rows):
+    """مولد JSON سطر لكل صف (NDJSON)"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False, default=_cell_text))
+        if len(lines) == CHUNK_ROWS:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines.clear()
+
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def ndjson_response(rows):
+    """استجابة NDJSON متدفقة (rows: أي iterable من dict)"""
+    return Response(
+        stream_with_context(ndjson_stream(rows)),
+        mimetype='application/x-ndjson',
+        headers={'X-Accel-Buffering': 'no'}
+    )
+
+
+def export_response(fmt, filename, headers, rows):
+    """استجابة تنزيل متدفقة لتقرير (rows: أي iterable من tuples)"""
+    if fmt == 'xlsx':
+        body = xlsx_stream(headers, rows, sheet_name=filename[:31])
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        body = csv_stream(headers, rows)
+        mimetype = 'text/csv'
+
+    full_name = f'{filename}_{date.today().isoformat()}.{fmt}'
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f"attachment; filename*=UTF-8''{quote(full_name)}",
+            'X-Accel-Buffering': 'no',
+        }
+    )
@@ -0,0 +1,108 @@
+"""
+الحقول الجزئية (?fields=) والإضافات (?include=) لموارد الـ API
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from app import db
+from app.utils.export import YIELD_PER
+
+
+class FieldSet:
+    """
+    اختيار حقول مورد من معاملات الطلب:
+    - ?fields=id,full_name,phone: أعمدة فقط، والاستعلام يختار هذه الأعمدة
+      وحدها (بدون تحميل الكائنات أو العلاقات).
+    - ?include=balance: الحقول المشتقة المكلفة، تُحسب لكل الصفحة باستعلام
+      تجميعي واحد وليس لكل صف.
+    بدون fields تُرجع to_dict() كاملة كما كانت.
+
+    derived: {الاسم: (دالة(ids) ← {id: قيمة}، موضع القيمة إن كانت tuple أو None)}
+    defaults: الحقول المشتقة الموجودة أصلاً في to_dict (يحملها preload)
+    expressions: {اسم العمود: دالة ترجع تعبير SQL يحل محل العمود}
+    """
+
+    def __init__(self, model, options=None, derived=None, defaults=(), preload=None,
+                 expressions=None, hidden=()):
+        self.model = model
+        self.options = options
+        self.derived = derived or {}
+        self.defaults = set(defaults)
+        self.preload = preload
+        self.expressions = expressions or {}
+        self.columns = {
+            column.key: column for column in model.__table__.columns
+            if column.key not in hidden
+        }
+
+    def parse(self, args):
+        """(الأعمدة المطلوبة أو None، الحقول المشتقة) مع رفض الأسماء غير المعروفة"""
+        requested = [f.strip() for f in args.get('fields', '').split(',') if f.strip()]
+        include = [f.strip() for f in args.get('include', '').split(',') if f.strip()]
+
+        # الحقول المشتقة مسموحة في fields أيضاً
+        include += [f for f in requested if f in self.derived]
+        fields = [f for f in requested if f not in self.derived]
+
+        unknown = [f for f in fields if f not in self.columns] + \
+            [f for f in include if f not in self.derived]
+        if unknown:
+            raise ValueError(f'حقول غير معروفة: {", ".join(dict.fromkeys(unknown))}')
+
+        fields = list(dict.fromkeys(['id'] + fields)) if requested else None
+        return fields, list(dict.fromkeys(include))
+
+    def prepare(self, query, fields, keys=()):
+        """أعمدة محددة فقط، أو الكائنات كاملة مع التحميل المسبق لما يحتاجه to_dict"""
+        if fields is None:
+            return query.options(*self.options()) if self.options else query
+
+        # أعمدة الترتيب مطلوبة لمؤشر الصفحة التالية
+        names = list(dict.fromkeys(fields + [column.key for column, _ in keys]))
+        return query.with_entities(*[self._expression(name) for name in names])
+
+    def _expression(self, name):
+        expression = self.expressions.get(name)
+        return (expression() if expression else getattr(self.model, name)).label(name)
+
+    def _value(self, name, value):
+        """قيمة العمود بنفس صيغة to_dict"""
+        if value is None and isinstance(self.columns[name].type, db.Numeric):
+            return 0
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        return value
+
+    def stream(self, query, fields=None):
+        """كل الصفوف كـ dict من مؤشر قاعدة البيانات على دفعات (للتصدير، بدون كائنات ORM)"""
+        fields = fields or list(self.columns)
+        for row in self.prepare(query, fields).yield_per(YIELD_PER):
+            yield {name: self._value(name, getattr(row, name)) for name in fields}
+
+    def serialize(self, items, fields=None, include=()):
+        """تحويل عناصر الصفحة إلى dict"""
+        if fields is None:
+            if self.preload:
+                self.preload(items)
+            include = [name for name in include if name not in self.defaults]
+
+        ids = [item.id for item in items]
+        loaded = {}
+        for name in include:
+            loader, _ = self.derived[name]
+            if loader not in loaded:
+                loaded[loader] = loader(ids) if ids else {}
+
+        data = []
+        for item in items:
+            if fields is None:
+                row = item.to_dict()
+            else:
+                row = {name: self._value(name, getattr(item, name)) for name in fields}
+            for name in include:
+                loader, position = self.derived[name]
+                value = loaded[loader][item.id]
+                row[name] = value if position is None else value[position]
+            data.append(row)
+        return data
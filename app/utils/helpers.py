@@ -1,8 +1,9 @@
 """
 دوال مساعدة
 """
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta
 from flask import current_app
+from app import db
 
 
 def format_money(amount, currency=None):
@@ -102,6 +103,23 @@ def payment_method_label(method):
     return methods.get(method, method)
 
 
+def date_range_filter(column, from_date=None, to_date=None):
+    """
+    شرط فترة زمنية على عمود DateTime قابل لاستخدام الفهارس:
+    column >= from_date AND column < to_date + يوم
+    """
+    conditions = []
+
+    if from_date:
+        conditions.append(column >= datetime.combine(from_date, time.min))
+
+    if to_date:
+        conditions.append(
+            column < datetime.combine(to_date + timedelta(days=1), time.min))
+
+    return db.and_(db.true(), *conditions)
+
+
 def get_pagination_info(page, per_page, total):
     """حساب معلومات الصفحات"""
     total_pages = (total + per_page - 1) // per_page
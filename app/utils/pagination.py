@@ -0,0 +1,114 @@
+"""
+Pagination لاستعلامات SQL المجمعة
+"""
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import and_, or_
+
+
+class SqlPagination:
+    """
+    تقسيم صفحات يُنفذ داخل قاعدة البيانات (LIMIT/OFFSET)
+    بنفس واجهة Pagination الخاصة بـ Flask-SQLAlchemy المستخدمة في القوالب.
+    """
+
+    def __init__(self, query, page, per_page, total=None):
+        self.page = max(page, 1)
+        self.per_page = max(per_page, 1)
+
+        # total يمكن تمريره من استعلام تجميعي مرافق لتجنب COUNT إضافي
+        if total is None:
+            total = query.order_by(None).count()
+        self.total = total
+
+        self.items = query.limit(self.per_page).offset(
+            (self.page - 1) * self.per_page).all() if total else []
+
+        self.pages = (total + self.per_page - 1) // self.per_page if total > 0 else 1
+        self.has_prev = self.page > 1
+        self.has_next = self.page < self.pages
+        self.prev_num = self.page - 1 if self.has_prev else None
+        self.next_num = self.page + 1 if self.has_next else None
+
+    def iter_pages(self, left_edge=2, left_current=2, right_current=3, right_edge=2):
+        """أرقام الصفحات للعرض (None = فاصل)"""
+        last = 0
+        for num in range(1, self.pages + 1):
+            if num <= left_edge or \
+               (num >= self.page - left_current and num <= self.page + right_current) or \
+               num > self.pages - right_edge:
+                if last + 1 != num:
+                    yield None
+                yield num
+                last = num
+
+
+class KeysetPagination:
+    """
+    تقسيم صفحات بالمؤشر (keyset): WHERE (المفاتيح) بعد آخر صف ORDER BY المفاتيح LIMIT
+    تكلفة أي صفحة ثابتة مهما بعدت (بدون OFFSET)، والعدد الكلي اختياري.
+
+    keys: [(العمود، تنازلي؟)] وآخرها مفتاح فريد (عادة id).
+    المؤشر نص مبهم يحمل قيم مفاتيح آخر صف في الصفحة السابقة.
+    """
+
+    def __init__(self, query, keys, cursor=None, per_page=20, with_total=False):
+        self.keys = keys
+        self.per_page = max(per_page, 1)
+        self.total = query.order_by(None).count() if with_total else None
+
+        if cursor:
+            query = query.filter(self._after(self.decode(cursor)))
+
+        query = query.order_by(*[
+            column.desc() if descending else column.asc() for column, descending in keys
+        ])
+        rows = query.limit(self.per_page + 1).all()
+
+        self.has_more = len(rows) > self.per_page
+        self.items = rows[:self.per_page]
+        self.next_cursor = self.encode(self.items[-1]) if self.has_more else None
+
+    def _after(self, values):
+        """
+        شرط "بعد الصف": (k1 > v1) OR (k1 = v1 AND k2 > v2) ...
+        (الاتجاه حسب ترتيب كل مفتاح)
+        """
+        conditions = []
+        for i, ((column, descending), value) in enumerate(zip(self.keys, values)):
+            equal = [c == v for (c, _), v in zip(self.keys[:i], values[:i])]
+            beyond = column < value if descending else column > value
+            conditions.append(and_(*equal, beyond))
+        return or_(*conditions)
+
+    def encode(self, item):
+        """مؤشر من قيم مفاتيح الصف"""
+        values = []
+        for column, _ in self.keys:
+            value = getattr(item, column.key)
+            values.append(value.isoformat() if isinstance(value, (date, datetime)) else value)
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode(self, cursor):
+        """قيم المفاتيح من المؤشر (ValueError إذا كان غير صالح)"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw)
+            if not isinstance(values, list) or len(values) != len(self.keys):
+                raise ValueError
+
+            decoded = []
+            for (column, _), value in zip(self.keys, values):
+                python_type = column.type.python_type
+                if python_type is datetime:
+                    value = datetime.fromisoformat(value)
+                elif python_type is date:
+                    value = date.fromisoformat(value)
+                elif not isinstance(value, python_type):
+                    raise ValueError
+                decoded.append(value)
+        except (ValueError, TypeError):
+            raise ValueError('مؤشر غير صالح')
+        return decoded
@@ -0,0 +1,74 @@
+"""Add daily sales and collection rollup tables
+
+Revision ID: 3f9c2a7d1b44
+Revises: 8066ae15f576
+Create Date: 2026-10-17 09:12:40.511203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1b44'
+down_revision = '8066ae15f576'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_sales_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('invoice_type', sa.String(length=20), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('invoices_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'invoice_type', 'user_id', name='uq_daily_sales_rollup_key')
+    )
+    with op.batch_alter_table('daily_sales_rollup', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_daily_sales_rollup_day'), ['day'], unique=False)
+
+    op.create_table('daily_collection_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('payment_method', sa.String(length=20), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('payments_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'payment_method', 'user_id', name='uq_daily_collection_rollup_key')
+    )
+    with op.batch_alter_table('daily_collection_rollup', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_daily_collection_rollup_day'), ['day'], unique=False)
+
+    # تعبئة الجداول من البيانات الحالية (مثل DailySalesRollup.rebuild و
+    # DailyCollectionRollup.rebuild) حتى لا تظهر التقارير فارغة بعد الترقية
+    op.execute(
+        "INSERT INTO daily_sales_rollup "
+        "(day, invoice_type, user_id, invoices_count, total_amount) "
+        "SELECT date(created_at), invoice_type, COALESCE(user_id, 0), "
+        "count(id), COALESCE(sum(total_amount), 0) "
+        "FROM invoices WHERE status != 'cancelled' "
+        "GROUP BY date(created_at), invoice_type, COALESCE(user_id, 0)"
+    )
+    op.execute(
+        "INSERT INTO daily_collection_rollup "
+        "(day, payment_method, user_id, payments_count, total_amount) "
+        "SELECT date(payment_date), COALESCE(payment_method, 'cash'), "
+        "COALESCE(user_id, 0), count(id), COALESCE(sum(amount), 0) "
+        "FROM payments "
+        "GROUP BY date(payment_date), COALESCE(payment_method, 'cash'), COALESCE(user_id, 0)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('daily_collection_rollup', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_daily_collection_rollup_day'))
+
+    op.drop_table('daily_collection_rollup')
+    with op.batch_alter_table('daily_sales_rollup', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_daily_sales_rollup_day'))
+
+    op.drop_table('daily_sales_rollup')
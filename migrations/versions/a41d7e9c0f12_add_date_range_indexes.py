@@ -0,0 +1,38 @@
+"""Add indexes for date-range report filters
+
+Revision ID: a41d7e9c0f12
+Revises: 3f9c2a7d1b44
+Create Date: 2026-10-17 11:03:27.904615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41d7e9c0f12'
+down_revision = '3f9c2a7d1b44'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.create_index('ix_invoices_created_at_status_type', ['created_at', 'status', 'invoice_type'], unique=False)
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_payments_payment_date'), ['payment_date'], unique=False)
+
+    with op.batch_alter_table('installments', schema=None) as batch_op:
+        batch_op.create_index('ix_installments_due_date_status', ['due_date', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('installments', schema=None) as batch_op:
+        batch_op.drop_index('ix_installments_due_date_status')
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payments_payment_date'))
+
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.drop_index('ix_invoices_created_at_status_type')
@@ -0,0 +1,26 @@
+"""Add index on installments.updated_at for report cache versioning
+
+Revision ID: a9d4e2c7b053
+Revises: f2c6a0b7e915
+Create Date: 2026-10-17 17:12:05.481320
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d4e2c7b053'
+down_revision = 'f2c6a0b7e915'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('installments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_installments_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('installments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_installments_updated_at'))
@@ -0,0 +1,32 @@
+"""Add composite indexes for keyset pagination
+
+Revision ID: b3f7c1e8d240
+Revises: a9d4e2c7b053
+Create Date: 2026-10-17 18:41:27.903114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f7c1e8d240'
+down_revision = 'a9d4e2c7b053'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('installments', schema=None) as batch_op:
+        batch_op.create_index('ix_installments_due_date_id', ['due_date', 'id'], unique=False)
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index('ix_payments_payment_date_id', ['payment_date', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index('ix_payments_payment_date_id')
+
+    with op.batch_alter_table('installments', schema=None) as batch_op:
+        batch_op.drop_index('ix_installments_due_date_id')
@@ -0,0 +1,26 @@
+"""Add product sku index for bulk upsert lookups
+
+Revision ID: c4e9a2f71d86
+Revises: b3f7c1e8d240
+Create Date: 2026-10-17 19:12:05.418230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e9a2f71d86'
+down_revision = 'b3f7c1e8d240'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_products_sku'), ['sku'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_products_sku'))
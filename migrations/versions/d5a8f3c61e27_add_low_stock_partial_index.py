@@ -0,0 +1,28 @@
+"""Add partial index for active low-stock products
+
+Revision ID: d5a8f3c61e27
+Revises: c7e2b5a9d318
+Create Date: 2026-10-17 14:02:51.330917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a8f3c61e27'
+down_revision = 'c7e2b5a9d318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_index('ix_products_low_stock', ['name'], unique=False,
+                              postgresql_where=sa.text('is_active AND quantity <= min_quantity'),
+                              sqlite_where=sa.text('is_active = 1 AND quantity <= min_quantity'))
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index('ix_products_low_stock')
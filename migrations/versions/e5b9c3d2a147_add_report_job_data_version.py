@@ -0,0 +1,26 @@
+"""Add data_version to report_jobs so results are reused only for unchanged data
+
+Revision ID: e5b9c3d2a147
+Revises: d6b1f4a8e372
+Create Date: 2026-10-17 21:12:40.318529
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b9c3d2a147'
+down_revision = 'd6b1f4a8e372'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('report_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('report_jobs', schema=None) as batch_op:
+        batch_op.drop_column('data_version')
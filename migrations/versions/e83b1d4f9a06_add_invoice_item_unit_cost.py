@@ -0,0 +1,39 @@
+"""Add unit_cost to invoice_items with backfill and covering index
+
+Revision ID: e83b1d4f9a06
+Revises: d5a8f3c61e27
+Create Date: 2026-10-17 14:48:13.562084
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e83b1d4f9a06'
+down_revision = 'd5a8f3c61e27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('invoice_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unit_cost', sa.Numeric(precision=10, scale=2), nullable=True))
+
+    # البنود القديمة: أفضل تقدير متاح هو سعر التكلفة الحالي للمنتج
+    op.execute(
+        'UPDATE invoice_items SET unit_cost = ('
+        'SELECT products.cost_price FROM products '
+        'WHERE products.id = invoice_items.product_id'
+        ') WHERE unit_cost IS NULL AND product_id IS NOT NULL'
+    )
+
+    with op.batch_alter_table('invoice_items', schema=None) as batch_op:
+        batch_op.create_index('ix_invoice_items_invoice_product', ['invoice_id', 'product_id'], unique=False,
+                              postgresql_include=['product_name', 'quantity', 'total_price', 'unit_cost'])
+
+
+def downgrade():
+    with op.batch_alter_table('invoice_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_invoice_items_invoice_product')
+        batch_op.drop_column('unit_cost')
@@ -0,0 +1,26 @@
+"""Add index on invoices.updated_at for report cache versioning
+
+Revision ID: f2c6a0b7e915
+Revises: e83b1d4f9a06
+Create Date: 2026-10-17 15:37:44.209186
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6a0b7e915'
+down_revision = 'e83b1d4f9a06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_invoices_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_invoices_updated_at'))
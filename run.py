@@ -2,8 +2,11 @@
 نقطة تشغيل التطبيق
 """
 import os
+import time
+import click
 from app import create_app, db
 from app.models import User, Category, Product, Customer, Invoice, Installment, Payment, Setting
+from app.models import DailySalesRollup, DailyCollectionRollup
 
 # إنشاء التطبيق
 app = create_app(os.environ.get('FLASK_ENV') or 'development')
@@ -66,5 +69,51 @@ def init_db():
         print('قاعدة البيانات موجودة مسبقاً')
 
 
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups():
+    """إعادة بناء جداول التجميع اليومي للمبيعات والتحصيل"""
+    DailySalesRollup.rebuild()
+    DailyCollectionRollup.rebuild()
+    db.session.commit()
+
+    print(f'تم إعادة بناء جداول التجميع: '
+          f'{DailySalesRollup.query.count()} صف مبيعات، '
+          f'{DailyCollectionRollup.query.count()} صف تحصيل')
+
+
+@app.cli.command('overdue-engine')
+@click.option('--daemon', is_flag=True, help='تشغيل مستمر مع فحص دوري')
+@click.option('--interval', default=600, type=int, help='ثواني بين كل فحص في وضع التشغيل المستمر')
+@click.option('--force', is_flag=True, help='التشغيل حتى لو تم التحديث اليوم')
+def overdue_engine(daemon, interval, force):
+    """تحديث حالة الأقساط المتأخرة (مرة يومياً)"""
+    from app.services.overdue import run_overdue_engine
+
+    while True:
+        updated = run_overdue_engine(force=force)
+        if updated is None:
+            print('تم التحديث اليوم أو يعمل عامل آخر - لا شيء للتنفيذ')
+        else:
+            print(f'تم تحديث {updated} قسط إلى متأخر')
+
+        if not daemon:
+            break
+
+        force = False
+        time.sleep(interval)
+
+
+@app.cli.command('report-worker')
+@click.option('--threads', default=2, type=int, help='عدد التقارير التي تُجهز في نفس الوقت')
+@click.option('--poll', default=2, type=int, help='ثواني بين كل فحص للمهام الجديدة')
+@click.option('--once', is_flag=True, help='تنفيذ المهام المنتظرة ثم الخروج')
+def report_worker(threads, poll, once):
+    """تنفيذ مهام التقارير في الخلفية"""
+    from app.services.report_jobs import run_worker
+
+    print(f'عامل التقارير يعمل ({threads} خيوط)')
+    run_worker(app, threads=threads, poll=poll, once=once)
+
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
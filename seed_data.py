@@ -3,6 +3,7 @@
 1000+ منتج، عملاء، فواتير، أقساط
 """
 from app.models.setting import Setting
+from app.models.daily_rollup import DailySalesRollup, DailyCollectionRollup
 from app.models.payment import Payment
 from app.models.installment import Installment
 from app.models.invoice import Invoice, InvoiceItem
@@ -250,7 +251,8 @@ def create_sample_data():
                     product_name=product.name,
                     quantity=qty,
                     unit_price=product.cash_price,
-                    total_price=qty * product.cash_price
+                    total_price=qty * product.cash_price,
+                    unit_cost=product.cost_price
                 )
                 db.session.add(item)
                 total += float(item.total_price)
@@ -295,7 +297,8 @@ def create_sample_data():
                     product_name=product.name,
                     quantity=qty,
                     unit_price=product.installment_price,
-                    total_price=qty * product.installment_price
+                    total_price=qty * product.installment_price,
+                    unit_cost=product.cost_price
                 )
                 db.session.add(item)
                 total += float(item.total_price)
@@ -355,6 +358,12 @@ def create_sample_data():
         db.session.commit()
         print(f'✅ تم إنشاء {installment_invoices} فاتورة تقسيط مع الأقساط')
 
+        # الفواتير والمدفوعات أُضيفت مباشرة، فتُبنى جداول التجميع منها
+        DailySalesRollup.rebuild()
+        DailyCollectionRollup.rebuild()
+        db.session.commit()
+        print('✅ تم بناء جداول التجميع اليومي')
+
         # تحديث الإعدادات
         settings = [
             ('store_name', 'نظام تقسيط الأمل'),
@@ -0,0 +1,120 @@
+"""
+إعدادات الاختبارات: تطبيق على SQLite في الذاكرة وبيانات تجريبية وعداد استعلامات
+"""
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.models import (
+    User, Category, Product, Customer, Invoice, InvoiceItem, Installment, Payment, ApiKey
+)
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    app.config.update(WTF_CSRF_ENABLED=False)
+
+    with app.app_context():
+        db.create_all()
+
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin(app):
+    """id المدير"""
+    with app.app_context():
+        user = User(username='admin', full_name='المدير', role='admin')
+        user.set_password('admin123')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def login(client, admin):
+    """تسجيل دخول المدير في جلسة عميل الاختبار"""
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin)
+        session['_fresh'] = True
+    return admin
+
+
+@pytest.fixture
+def api_headers(app):
+    with app.app_context():
+        key = ApiKey.create_key('tests')
+        return {'X-API-KEY': key.api_key}
+
+
+@pytest.fixture
+def populate(app, admin):
+    """إضافة n عميل بمنتج وفاتورة تقسيط وقسطين (أحدهما متأخر) ودفعة لكل منهم"""
+    counter = {'n': 0}
+
+    def populate(n):
+        with app.app_context():
+            for _ in range(n):
+                k = counter['n'] = counter['n'] + 1
+                customer = Customer(full_name=f'عميل {k}', phone=f'0100{k:06d}')
+                category = Category(name=f'قسم {k}')
+                db.session.add_all([customer, category])
+                db.session.flush()
+
+                product = Product(name=f'منتج {k}', cash_price=100, installment_price=120,
+                                  cost_price=60, quantity=5, category_id=category.id)
+                invoice = Invoice(invoice_number=f'INV-T{k:06d}', invoice_type='installment',
+                                  customer_id=customer.id, user_id=admin, total_amount=120,
+                                  paid_amount=20, remaining_amount=100, status='active')
+                db.session.add_all([product, invoice])
+                db.session.flush()
+
+                overdue = Installment(invoice_id=invoice.id, installment_number=1, amount=50,
+                                      remaining_amount=50, status='pending',
+                                      due_date=date.today() - timedelta(days=10))
+                db.session.add_all([
+                    InvoiceItem(invoice_id=invoice.id, product_id=product.id,
+                                product_name=product.name, quantity=1, unit_price=120,
+                                total_price=120, unit_cost=60),
+                    overdue,
+                    Installment(invoice_id=invoice.id, installment_number=2, amount=50,
+                                remaining_amount=50, status='pending',
+                                due_date=date.today() + timedelta(days=20)),
+                ])
+                db.session.flush()
+
+                db.session.add(Payment(invoice_id=invoice.id, amount=20, user_id=admin,
+                                       receipt_number=f'RCP-T{k:06d}',
+                                       payment_date=datetime.utcnow()))
+            db.session.commit()
+
+    return populate
+
+
+@contextmanager
+def count_queries(app):
+    """عدد أوامر SQL المنفذة داخل الكتلة (counter['n'])"""
+    with app.app_context():
+        engine = db.engine
+
+    counter = {'n': 0}
+
+    def before_cursor_execute(*args):
+        counter['n'] += 1
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
@@ -0,0 +1,101 @@
+"""
+التصدير يُرسل متدفقاً ويقرأ الصفوف على دفعات (yield_per) دون تحميلها كاملة
+"""
+import csv
+import io
+import json
+import zipfile
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy.orm import Query
+from app import db
+from app.models import Customer, Invoice, Installment, Payment
+from app.utils.export import YIELD_PER
+
+ROWS = 2500
+
+
+@pytest.fixture
+def bulk(app, admin):
+    """ROWS فاتورة تقسيط بقسط متأخر ودفعة لكل منها (إدخال جماعي)"""
+    with app.app_context():
+        customer = Customer(full_name='عميل التصدير', phone='0100000000')
+        db.session.add(customer)
+        db.session.flush()
+
+        now = datetime.utcnow()
+        db.session.execute(db.insert(Invoice), [{
+            'invoice_number': f'INV-E{k:06d}', 'invoice_type': 'installment',
+            'customer_id': customer.id, 'user_id': admin, 'total_amount': 100,
+            'paid_amount': 10, 'remaining_amount': 90, 'status': 'active', 'created_at': now,
+        } for k in range(ROWS)])
+        ids = db.session.scalars(db.select(Invoice.id)).all()
+
+        db.session.execute(db.insert(Installment), [{
+            'invoice_id': id, 'installment_number': 1, 'amount': 90, 'remaining_amount': 90,
+            'status': 'pending', 'due_date': date.today() - timedelta(days=5),
+        } for id in ids])
+        db.session.execute(db.insert(Payment), [{
+            'invoice_id': id, 'amount': 10, 'payment_method': 'cash', 'user_id': admin,
+            'receipt_number': f'RCP-E{id:06d}', 'payment_date': now,
+        } for id in ids])
+        db.session.commit()
+
+
+@pytest.fixture
+def query_calls(monkeypatch):
+    """تسجيل استدعاءات Query.yield_per و Query.all"""
+    calls = {'yield_per': [], 'all': 0}
+    yield_per, all_ = Query.yield_per, Query.all
+
+    def spy_yield_per(self, count):
+        calls['yield_per'].append(count)
+        return yield_per(self, count)
+
+    def spy_all(self):
+        calls['all'] += 1
+        return all_(self)
+
+    monkeypatch.setattr(Query, 'yield_per', spy_yield_per)
+    monkeypatch.setattr(Query, 'all', spy_all)
+    return calls
+
+
+@pytest.mark.parametrize('entity', ['invoices', 'installments', 'payments'])
+def test_api_export_streams_in_batches(client, api_headers, bulk, query_calls, entity):
+    response = client.get(f'/api/v2/export/{entity}', headers=api_headers)
+
+    assert response.status_code == 200
+    assert response.is_streamed
+
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == ROWS
+    assert json.loads(lines[0])['id']
+    assert query_calls['yield_per'] == [YIELD_PER]
+    assert query_calls['all'] == 0
+
+
+@pytest.mark.parametrize('report', ['sales', 'collections', 'overdue'])
+def test_csv_report_export_streams_in_batches(client, login, bulk, query_calls, report):
+    response = client.get(f'/reports/{report}?format=csv')
+
+    assert response.status_code == 200
+    assert response.is_streamed
+
+    text = response.get_data(as_text=True).lstrip('\ufeff')
+    assert len(list(csv.reader(io.StringIO(text)))) == ROWS + 1
+    assert query_calls['yield_per'] == [YIELD_PER]
+    assert query_calls['all'] == 0
+
+
+def test_xlsx_report_export_streams_in_batches(client, login, bulk, query_calls):
+    response = client.get('/reports/collections?format=xlsx')
+
+    assert response.status_code == 200
+    assert response.is_streamed
+
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as workbook:
+        sheet = workbook.read('xl/worksheets/sheet1.xml')
+    assert sheet.count(b'<row>') == ROWS + 1
+    assert query_calls['yield_per'] == [YIELD_PER]
+    assert query_calls['all'] == 0
@@ -0,0 +1,64 @@
+"""
+إحصائيات الأقساط ولوحة التحكم تُحسب بالتجميع في SQL دون تحميل صفوف الأقساط
+"""
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.models import Installment
+from tests.conftest import count_queries
+
+
+@contextmanager
+def count_loaded(model):
+    """عدد الكائنات المحملة من الجدول داخل الكتلة"""
+    counter = {'n': 0}
+
+    def on_load(target, context):
+        counter['n'] += 1
+
+    event.listen(model, 'load', on_load)
+    try:
+        yield counter
+    finally:
+        event.remove(model, 'load', on_load)
+
+
+def test_get_stats_is_one_aggregate_query(app, populate):
+    populate(20)
+
+    with app.app_context(), count_queries(app) as queries, count_loaded(Installment) as loaded:
+        stats = Installment.get_stats()
+
+    assert queries['n'] == 1
+    assert loaded['n'] == 0
+    assert stats['overdue_count'] == 20
+    assert stats['overdue_amount'] == 20 * 50
+    assert stats['today_count'] == 0
+
+
+def _dashboard(app, client, url):
+    assert client.get(url).status_code == 200
+
+    with count_queries(app) as queries, count_loaded(Installment) as loaded:
+        assert client.get(url).status_code == 200
+    return queries['n'], loaded['n']
+
+
+def test_dashboard_does_not_grow_with_installments(app, client, login, populate):
+    populate(5)
+    small = _dashboard(app, client, '/dashboard')
+    populate(45)
+    large = _dashboard(app, client, '/dashboard')
+
+    assert small[0] == large[0]
+    # لا يُحمل إلا آخر 5 أقساط متأخرة للعرض
+    assert large[1] <= 5
+
+
+def test_dashboard_stats_do_not_load_installments(app, client, login, populate):
+    populate(5)
+    small = _dashboard(app, client, '/dashboard/stats')
+    populate(45)
+    large = _dashboard(app, client, '/dashboard/stats')
+
+    assert small[0] == large[0]
+    assert large[1] == 0
@@ -0,0 +1,56 @@
+"""
+كفاءة التحصيل في تقرير أداء الموظفين تعكس المسدد فعلاً من الأقساط
+"""
+from datetime import date, timedelta
+from app import db
+from app.models import Installment
+
+
+def _performance(client, api_headers, user_id):
+    """صف المستخدم في التقرير (فواتيره هي مصدر المستحق)"""
+    period = {'from': (date.today() - timedelta(days=30)).isoformat(),
+              'to': date.today().isoformat()}
+    response = client.get('/api/v2/reports/performance', query_string=period,
+                          headers=api_headers)
+    assert response.status_code == 200
+    return next(row for row in response.get_json()['data'] if row['user_id'] == user_id)
+
+
+def test_paying_installment_raises_collection_efficiency(app, client, api_headers, admin, populate):
+    populate(1)
+    with app.app_context():
+        installment = Installment.query.filter_by(installment_number=2).one()
+        # قسط يستحق خلال فترة التقرير
+        installment.due_date = date.today()
+        db.session.commit()
+        installment_id = installment.id
+
+    before = _performance(client, api_headers, admin)
+    assert before['due_paid'] == 0
+    assert before['collection_efficiency'] == 0
+
+    response = client.post(f'/api/v2/installments/{installment_id}/pay',
+                           json={'amount': 30}, headers=api_headers)
+    assert response.status_code == 200
+
+    after = _performance(client, api_headers, admin)
+    assert after['due_paid'] == 30
+    assert after['collection_efficiency'] > 0
+    assert after['due_total'] == before['due_total']
+
+
+def test_fully_paid_installment_counts_as_collected(app, client, api_headers, admin, populate):
+    populate(1)
+    with app.app_context():
+        installment = Installment.query.filter_by(installment_number=2).one()
+        installment.due_date = date.today()
+        db.session.commit()
+        installment_id = installment.id
+
+    client.post(f'/api/v2/installments/{installment_id}/pay', json={}, headers=api_headers)
+
+    after = _performance(client, api_headers, admin)
+    # القسط المتأخر (غير مسدد) والقسط المسدد بالكامل
+    assert after['due_total'] == 100
+    assert after['due_paid'] == 50
+    assert after['collection_efficiency'] == 0.5
@@ -0,0 +1,49 @@
+"""
+عدد الاستعلامات في القوائم ثابت مهما كان حجم الصفحة (لا استعلام لكل صف)
+"""
+import pytest
+from tests.conftest import count_queries
+
+API_LISTS = [
+    '/api/v2/products',
+    '/api/v2/categories',
+    '/api/v2/customers',
+    '/api/v2/invoices',
+    '/api/v2/installments',
+    '/api/v2/payments',
+]
+
+PAGES = [
+    '/products/',
+    '/categories/',
+    '/customers/',
+    '/invoices/',
+    '/installments/',
+    '/installments/overdue',
+    '/payments/',
+    '/settings/activity-log',
+]
+
+
+def _queries(app, client, url, per_page, headers=None):
+    url = f'{url}?per_page={per_page}'
+    # الطلب الأول يملأ ذاكرة مفاتيح API والمستخدم
+    assert client.get(url, headers=headers).status_code == 200
+
+    with count_queries(app) as counter:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return counter['n']
+
+
+@pytest.mark.parametrize('url', API_LISTS)
+def test_api_list_queries_do_not_grow_with_page_size(app, client, api_headers, populate, url):
+    populate(12)
+    assert _queries(app, client, url, 2, api_headers) == \
+        _queries(app, client, url, 10, api_headers)
+
+
+@pytest.mark.parametrize('url', PAGES)
+def test_page_queries_do_not_grow_with_page_size(app, client, login, populate, url):
+    populate(12)
+    assert _queries(app, client, url, 2) == _queries(app, client, url, 10)